@@ -1,57 +1,193 @@
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields, replace
+from typing import Awaitable, Callable
 from datetime import datetime
+import functools
 import html
 import asyncio
+import inspect
 import os
+import re
+import time
+import uuid
 import aiohttp
-from bs4 import BeautifulSoup
-from pydantic_ai import Agent, RunContext, ModelRetry
+from pydantic_ai import Agent, RunContext, ModelRetry, ToolOutput
+from pydantic_ai.agent import CallToolsNode
+from pydantic_ai.messages import ModelMessage, ToolCallPart, ToolReturnPart
 from pydantic_ai.settings import ModelSettings
+from pydantic_ai.tools import ToolDefinition
+from pydantic_ai.usage import Usage
 import logfire
 
-from prompts import sub_agent_prompt, lead_agent_prompt
+from checkpoints import CheckpointStore
+from compression import CompressionStats, ContentCompressor
+from connections import ConnectionPool
+from encoders import ResultEncoder
+from evidence import EvidenceStore, PageRecord
+from extraction import TextExtractor
+from fetcher import Fetcher, backoff_delay, retry_after
+from findings import Findings, SubagentReport, normalize_findings
+from history import HistoryCompactor
+from metrics import LEAD_AGENT_ID, RunMetrics
+from page_cache import PageCache
+from prefetch import Prefetcher
+from prompts import sub_agent_prompt, lead_agent_prompt, lead_agent_streaming_addendum
+from scheduler import LEAD_PRIORITY, PREFETCH_PRIORITY, SUBAGENT_PRIORITY, Scheduler
+from search_cache import SearchCache, normalize_search_key
+from subagents import SubagentPool
 
-# Configure Logfire
-logfire.configure()
-logfire.instrument_pydantic_ai()
-logfire.instrument_aiohttp_client()
+_logfire_configured = False
 
 
-def extract_text_content(html_content: str) -> str:
-    """Extract clean readable text from HTML content using BeautifulSoup."""
-    soup = BeautifulSoup(html_content, 'html.parser')
-    
-    # Remove unwanted elements
-    for element in soup.find_all(['script', 'style', 'nav', 'header', 'footer', 'aside', 'menu']):
-        element.decompose()
-    
-    # Extract clean text with proper spacing
-    text = soup.get_text(separator=' ', strip=True)
-    
-    return text
+def configure_logfire() -> None:
+    """
+    Configure Logfire tracing once per process.
+
+    Called when a research run starts rather than at import, because spawned
+    extraction workers re-import the main script and, through it, this module.
+    """
+    global _logfire_configured
+    if _logfire_configured:
+        return
+    _logfire_configured = True
+    logfire.configure()
+    logfire.instrument_pydantic_ai()
+    logfire.instrument_aiohttp_client()
 
 
 @dataclass
 class AgentDeps:
     current_date: str = field(default_factory=lambda: datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+    http: ConnectionPool = field(default_factory=ConnectionPool)
+    search_cache: SearchCache = field(default_factory=lambda: SearchCache(db_path=os.getenv("SEARCH_CACHE_PATH")))
+    page_cache: PageCache = field(default_factory=lambda: PageCache(db_path=os.getenv("PAGE_CACHE_PATH")))
+    extractor: TextExtractor = field(default_factory=TextExtractor)
+    fetcher: Fetcher = field(default_factory=Fetcher)
+    scheduler: Scheduler = field(default_factory=Scheduler)
+    compressor: ContentCompressor = field(default_factory=ContentCompressor)
+    encoder: ResultEncoder = field(default_factory=lambda: ResultEncoder(os.getenv("RESULT_FORMAT", "xml")))
+    evidence: EvidenceStore = field(default_factory=EvidenceStore)
+    subagents: SubagentPool = field(default_factory=SubagentPool)
+    prefetcher: Prefetcher = field(default_factory=Prefetcher)
+    history: HistoryCompactor = field(default_factory=HistoryCompactor)
+    subagent_usage: Usage = field(default_factory=Usage)
+    metrics: RunMetrics = field(default_factory=RunMetrics)
+    checkpoints: CheckpointStore = field(default_factory=lambda: CheckpointStore(db_path=os.getenv("CHECKPOINT_PATH")))
+    run_id: str = ""
+    attempt: int = 1
+    agent_id: str = LEAD_AGENT_ID
+
+    def for_query(self, run_id: str | None = None) -> "AgentDeps":
+        """
+        Deps for one research query that share this instance's connection pool,
+        caches, extractor, fetcher, scheduler and checkpoint store but track evidence,
+        subagents, prefetches and usage separately.
+        """
+        return replace(
+            self,
+            run_id=run_id or uuid.uuid4().hex,
+            current_date=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            compressor=replace(self.compressor, stats=CompressionStats()),
+            evidence=EvidenceStore(),
+            subagents=SubagentPool(streaming=self.subagents.streaming, time_budget=self.subagents.time_budget),
+            prefetcher=Prefetcher(
+                enabled=self.prefetcher.enabled,
+                top_n=self.prefetcher.top_n,
+                max_concurrent=self.prefetcher.max_concurrent,
+                max_bytes=self.prefetcher.max_bytes,
+            ),
+            history=HistoryCompactor(
+                enabled=self.history.enabled,
+                max_tokens=self.history.max_tokens,
+                keep_recent=self.history.keep_recent,
+                fallback_chars=self.history.fallback_chars,
+            ),
+            subagent_usage=Usage(),
+            metrics=RunMetrics(record_events=self.metrics.record_events, echo=self.metrics.echo),
+        )
+
+    def shared_stats(self) -> dict:
+        """Stats of the resources for_query shares across queries."""
+        return {
+            "connections": self.http.stats.as_dict(),
+            "search_cache": self.search_cache.stats.as_dict(),
+            "page_cache": self.page_cache.stats.as_dict(),
+            "fetch": self.fetcher.stats.as_dict(),
+            "scheduler": self.scheduler.stats(),
+            "checkpoints": self.checkpoints.stats.as_dict(),
+        }
+
+    def stats(self) -> dict:
+        return {
+            **self.shared_stats(),
+            "compression": self.compressor.stats.as_dict(),
+            "evidence": self.evidence.stats.as_dict(),
+            "prefetch": self.prefetcher.stats.as_dict(),
+        }
+
+    async def aclose(self) -> None:
+        """Release resources shared across the research run."""
+        await self.subagents.close()
+        await self.prefetcher.cancel()
+        await self.http.close()
+        self.search_cache.close()
+        self.page_cache.close()
+        self.checkpoints.close()
+        self.extractor.close()
 
 @dataclass
 class SubAgentDeps(AgentDeps):
     brave_api_key: str = field(default_factory=lambda: os.getenv("BRAVE_API_KEY", "default_key"))
+    brave_search_url: str = field(default_factory=lambda: os.getenv("BRAVE_SEARCH_URL", "https://api.search.brave.com/res/v1/web/search"))
+
+    @classmethod
+    def from_parent(cls, deps: AgentDeps, **overrides) -> "SubAgentDeps":
+        """Create subagent deps that share the lead agent's run-wide resources."""
+        shared = {f.name: getattr(deps, f.name) for f in fields(AgentDeps)}
+        return cls(**{**shared, **overrides})
 
 sub_agent = Agent(
     model="openai:gpt-4.1-nano",
     deps_type=SubAgentDeps,
+    # Structured reports through complete_task; a plain-text report is normalized instead
+    output_type=[
+        ToolOutput(SubagentReport, name="complete_task", description="Finish the task and hand your report to the lead researcher"),
+        str,
+    ],
     model_settings=ModelSettings(parallel_tool_calls=True),
     instrument=True,
     retries=2
 )
 
+def checkpointed(tool: Callable[..., Awaitable[str]]) -> Callable[..., Awaitable[str]]:
+    """
+    Save a subagent tool's successful outputs to the run's checkpoints, and
+    replay outputs saved by an earlier attempt of the run for the same arguments.
+    """
+    signature = inspect.signature(tool)
+    
+    @functools.wraps(tool)
+    async def wrapper(ctx: RunContext[SubAgentDeps], *args, **kwargs) -> str:
+        bound = signature.bind(ctx, *args, **kwargs)
+        bound.apply_defaults()
+        call_args = {name: value for name, value in bound.arguments.items() if name != "ctx"}
+        deps = ctx.deps
+        saved = deps.checkpoints.tool_output(deps.run_id, deps.attempt, tool.__name__, call_args)
+        if saved is not None:
+            deps.metrics.emit(deps.agent_id, "replayed", tool=tool.__name__)
+            return saved
+        output = await tool(ctx, *args, **kwargs)
+        if not deps.encoder.is_error(output):
+            deps.checkpoints.save_tool_output(deps.run_id, deps.attempt, tool.__name__, call_args, output)
+        return output
+    
+    return wrapper
+
 @sub_agent.instructions
 def subagent_instruction(ctx: RunContext[SubAgentDeps]):
     return sub_agent_prompt.replace("{{.CurrentDate}}", ctx.deps.current_date)
 
 @sub_agent.tool(retries=3)
+@checkpointed
 async def web_search(
     ctx: RunContext[SubAgentDeps],
     query: str,
@@ -69,80 +205,177 @@ async def web_search(
         search_lang: Language for search results
         
     Returns:
-        str: XML-formatted search results including query and web results
+        str: Search results with titles, URLs and descriptions, in the configured result format
     """
-    print("Running search on: ", query)
+    metrics = ctx.deps.metrics
+    metrics.emit(ctx.deps.agent_id, "web_search", query=query)
     
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                "https://api.search.brave.com/res/v1/web/search",
-                headers={
-                    "X-Subscription-Token": ctx.deps.brave_api_key,
-                },
-                params={
-                    "q": query,
-                    "count": count,
-                    "country": country,
-                    "search_lang": search_lang,
-                    "result_filter": "web"
-                },
-            ) as response:
-                # Handle HTTP error status codes
-                if response.status >= 400:
-                    if response.status == 429:  # Rate limited
-                        await asyncio.sleep(2)
-                        raise ModelRetry(f"Rate limited (429), retrying search for: {query}")
-                    elif response.status >= 500:  # Server errors
-                        await asyncio.sleep(3)
-                        raise ModelRetry(f"Server error ({response.status}), retrying search for: {query}")
-                    
-                json_data = await response.json()
-                
-                # Extract query and results from JSON
-                escaped_query = html.escape(query)
-                results_xml = ""
-                total_count = 0
-                
-                # Extract web results if they exist
-                if "web" in json_data and "results" in json_data["web"]:
-                    web_results = json_data["web"]["results"]
-                    total_count = len(web_results)
-                    
-                    for result in web_results:
-                        title = html.escape(result.get("title", ""))
-                        url = html.escape(result.get("url", ""))
-                        description = html.escape(result.get("description", ""))
-                        
-                        results_xml += f"""
-<result>
-<title>{title}</title>
-<url>{url}</url>
-<description>{description}</description>
-</result>"""
-                
-                return f"""<search_result>
-<query>{escaped_query}</query>
-<total_count>{total_count}</total_count>
-<results>{results_xml}
-</results>
-</search_result>"""
-                
-    except aiohttp.ClientError as e:
-        # Network/connection errors - retry with delay
-        await asyncio.sleep(2)
-        raise ModelRetry(f"Network error during search, retrying: {str(e)}")
+        cache_key = normalize_search_key(query, count, country, search_lang)
+        searched = False
+        
+        async def search() -> list[dict]:
+            nonlocal searched
+            searched = True
+            return await brave_search(ctx.deps, query, count, country, search_lang)
+        
+        web_results = await ctx.deps.search_cache.get_or_fetch(cache_key, search)
+        metrics.count("search_cache.miss" if searched else "search_cache.hit")
+        urls = [result.get("url", "") for result in web_results]
+        ctx.deps.evidence.record_search(cache_key, query, ctx.deps.agent_id, urls)
+        prefetched = ctx.deps.prefetcher.schedule(
+            ctx.deps.agent_id, ctx.deps.encoder.links(web_results), lambda url: prefetch_page(ctx.deps, url)
+        )
+        if prefetched:
+            metrics.emit(ctx.deps.agent_id, "prefetch", urls=prefetched)
+        
+        return ctx.deps.encoder.search(query, web_results)
+            
+    except ModelRetry:
+        raise
     except Exception as e:
         # For other exceptions, return error without retry
-        escaped_error = html.escape(str(e))
-        escaped_query = html.escape(query)
-        return f"""<search_result>
-<query>{escaped_query}</query>
-<error>{escaped_error}</error>
-</search_result>"""
-
-@sub_agent.tool_plain
+        return ctx.deps.encoder.search_error(query, str(e))
+
+
+SEARCH_ATTEMPTS = 4
+# Longest pause of the shared API key between attempts, whatever Retry-After asks for
+SEARCH_BACKOFF_CAP = 16.0
+
+
+class SearchAPIError(Exception):
+    """Raised for a search API response that retrying will not fix, so nothing is cached."""
+
+
+async def brave_search(
+    deps: SubAgentDeps,
+    query: str,
+    count: int,
+    country: str,
+    search_lang: str
+) -> list[dict]:
+    """
+    Call the Brave Search API and return the raw list of web results.
+    
+    Calls go through the scheduler's search lane. Rate limits, server errors and
+    network errors back off the API key and are retried in the lane; the model is
+    only asked to retry once every attempt has failed. Other error statuses and
+    non-JSON responses raise SearchAPIError straight away.
+    """
+    lane = deps.scheduler.search
+    metrics = deps.metrics
+    for attempt in range(SEARCH_ATTEMPTS):
+        delay = backoff_delay(attempt, 1.0, SEARCH_BACKOFF_CAP)
+        try:
+            async with lane.slot(SUBAGENT_PRIORITY, deps.brave_api_key) as waited:
+                metrics.add_time(deps.agent_id, "queue", waited)
+                start = time.perf_counter()
+                async with deps.http.session.get(
+                    deps.brave_search_url,
+                    headers={
+                        "X-Subscription-Token": deps.brave_api_key,
+                    },
+                    params={
+                        "q": query,
+                        "count": count,
+                        "country": country,
+                        "search_lang": search_lang,
+                        "result_filter": "web"
+                    },
+                ) as response:
+                    # Handle HTTP error status codes
+                    if response.status == 429 or response.status >= 500:
+                        error = f"HTTP {response.status}"
+                        delay = min(SEARCH_BACKOFF_CAP, retry_after(response.headers, delay))
+                    elif response.status >= 400:
+                        detail = (await response.text())[:200]
+                        raise SearchAPIError(f"Search API returned HTTP {response.status}: {detail}")
+                    else:
+                        try:
+                            json_data = await response.json()
+                        except aiohttp.ContentTypeError as e:
+                            raise SearchAPIError(f"Search API returned {e.message}") from e
+                        metrics.add_time(deps.agent_id, "search", time.perf_counter() - start)
+                        
+                        # Extract web results if they exist
+                        if "web" in json_data and "results" in json_data["web"]:
+                            return json_data["web"]["results"]
+                        return []
+                metrics.add_time(deps.agent_id, "search", time.perf_counter() - start)
+        except aiohttp.ClientError as e:
+            error = f"network error: {e}"
+        
+        # Queue behind the backoff instead of handing the failure to the model
+        metrics.emit(deps.agent_id, "search_retry", query=query, error=error, delay=delay)
+        lane.backoff(deps.brave_api_key, delay)
+        if attempt + 1 < SEARCH_ATTEMPTS:
+            await asyncio.sleep(delay)
+    
+    raise ModelRetry(f"Search failed after {SEARCH_ATTEMPTS} attempts ({error}), retrying search for: {query}")
+
+async def fetch_page(
+    deps: SubAgentDeps,
+    url: str,
+    timeout: int,
+    headers: dict | None,
+    priority: int = SUBAGENT_PRIORITY
+) -> PageRecord:
+    """
+    Fetch and extract a page, going through the HTTP page cache.
+
+    The request itself goes through deps.fetcher, which bounds redirects and
+    timeouts and retries transient failures, and may hedge slow requests.
+    """
+    page_cache = deps.page_cache
+    metrics = deps.metrics
+    cached = page_cache.get(url)
+    if cached is not None and cached.is_fresh():
+        page_cache.stats.hits += 1
+        metrics.count("page_cache.hit")
+        return PageRecord(url, cached.final_url, cached.status, cached.text, deps.agent_id)
+
+    # Revalidate stale entries with a conditional GET
+    request_headers = {**(headers or {}), **(cached.validators() if cached else {})}
+    async def handle(response: aiohttp.ClientResponse) -> tuple[PageRecord, bool]:
+        # A hedged request may run this twice; both runs store the same page
+        metrics.add_time(deps.agent_id, "fetch_network", time.perf_counter() - start)
+        if response.status == 304 and cached is not None:
+            refreshed = page_cache.refresh(url, cached, response.headers)
+            return PageRecord(url, refreshed.final_url, refreshed.status, refreshed.text, deps.agent_id), True
+
+        text_content = await deps.extractor.extract_response(response, metrics, deps.agent_id)
+        final_url, status = str(response.url), response.status
+        page_cache.store(url, final_url, status, text_content, response.headers)
+        return PageRecord(url, final_url, status, text_content, deps.agent_id), False
+
+    async with deps.scheduler.fetch.slot(priority) as waited:
+        metrics.add_time(deps.agent_id, "queue", waited)
+        start = time.perf_counter()
+        page, revalidated = await deps.fetcher.get(deps.http.session, url, handle, request_headers, timeout)
+    if revalidated:
+        metrics.count("page_cache.hit")
+    else:
+        page_cache.stats.misses += 1
+        metrics.count("page_cache.miss")
+    return page
+
+async def prefetch_page(deps: SubAgentDeps, url: str) -> PageRecord:
+    """Fetch a search result ahead of the model, behind real fetches in the fetch lane."""
+    return await deps.evidence.fetch_once(url, lambda: fetch_page(deps, url, 30, None, PREFETCH_PRIORITY))
+
+def research_focus(ctx: RunContext[SubAgentDeps]) -> str:
+    """Describe what the subagent is looking for: its task plus the searches it has run."""
+    parts = [ctx.prompt if isinstance(ctx.prompt, str) else ""]
+    for message in ctx.messages:
+        for part in message.parts:
+            if isinstance(part, ToolCallPart) and part.tool_name == "web_search":
+                parts.append(str(part.args_as_dict().get("query", "")))
+    return " ".join(parts)
+
+@sub_agent.tool
+@checkpointed
 async def web_fetch(
+    ctx: RunContext[SubAgentDeps],
     url: str,
     timeout: int = 30,
     headers: dict | None = None
@@ -156,34 +389,80 @@ async def web_fetch(
         headers: Optional headers to include in the request
         
     Returns:
-        str: XML-formatted response data including status, content, and URL
+        str: Page status, content and URL, in the configured result format
     """
-    print(f"Fetching URL: {url}")
+    metrics = ctx.deps.metrics
+    metrics.emit(ctx.deps.agent_id, "web_fetch", url=url)
+    # Compact result formats show https URLs without their scheme
+    if not url.startswith(("http://", "https://")):
+        url = f"https://{url}"
     try:
-        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=timeout)) as session:
-            async with session.get(url, headers=headers or {}) as response:
-                html_content = await response.text()
-                text_content = extract_text_content(html_content)
-                escaped_content = html.escape(text_content)
-                escaped_url = html.escape(str(response.url))
-                return f"""<fetch_result>
-<url>{escaped_url}</url>
-<status_code>{response.status}</status_code>
-<content>{escaped_content}</content>
-</fetch_result>"""
+        fetched = False
+        
+        async def fetch() -> PageRecord:
+            nonlocal fetched
+            fetched = True
+            return await fetch_page(ctx.deps, url, timeout, headers)
+        
+        # Another subagent may already have fetched (or be fetching) this URL
+        page = await ctx.deps.evidence.fetch_once(url, fetch)
+        metrics.count("evidence.miss" if fetched else "evidence.hit")
+        if ctx.deps.prefetcher.claim(url):
+            metrics.count("prefetch.used")
+        final_url, status, text_content = page.final_url, page.status, page.text
+
+        # Keep only the passages relevant to the task so long pages do not flood the context
+        compressed = ctx.deps.compressor.compress(text_content, research_focus(ctx))
+        note = None
+        if compressed.truncated:
+            note = f"Showing the {compressed.passages_kept} of {compressed.passages_total} passages most relevant to your task"
+        ctx.deps.evidence.record_passages(url, compressed.passages)
+        ctx.deps.evidence.record_read(ctx.deps.agent_id, final_url)
+        return ctx.deps.encoder.fetch(final_url, status, compressed.text, note)
     except Exception as e:
-        escaped_error = html.escape(str(e))
-        escaped_url = html.escape(url)
-        return f"""<fetch_result>
-<url>{escaped_url}</url>
-<status_code>error</status_code>
-<error>{escaped_error}</error>
-</fetch_result>"""
+        return ctx.deps.encoder.fetch_error(url, str(e))
 
+@sub_agent.tool
+async def shared_findings(ctx: RunContext[SubAgentDeps], topic: str) -> str:
+    """
+    Check what other research subagents working on the same query have already found.
+    
+    Use this before searching to avoid repeating work another subagent has done.
+    
+    Args:
+        topic: What you are about to research
+        
+    Returns:
+        str: XML-formatted searches other subagents have run and the most relevant passages they read
+    """
+    searches, passages = ctx.deps.evidence.lookup(topic, ctx.deps.agent_id)
+    searches_xml = "".join(f"\n<query>{html.escape(record.query)}</query>" for record in searches)
+    passages_xml = "".join(
+        f"""
+<passage>
+<url>{html.escape(record.final_url)}</url>
+<text>{html.escape(passage)}</text>
+</passage>"""
+        for record, passage in passages
+    )
+    return f"""<shared_findings>
+<searches>{searches_xml}
+</searches>
+<passages>{passages_xml}
+</passages>
+</shared_findings>"""
+
+
+async def manage_lead_context(ctx: RunContext[AgentDeps], messages: list[ModelMessage]) -> list[ModelMessage]:
+    """Record the lead's prompt size each turn, compacting old subagent results when enabled."""
+    messages, sizes = ctx.deps.history.process(messages)
+    ctx.deps.metrics.record_context(LEAD_AGENT_ID, **sizes)
+    return messages
 
 lead_agent = Agent(
     model="openai:gpt-4.1-mini",
     deps_type=AgentDeps,
+    history_processors=[manage_lead_context],
     model_settings=ModelSettings(parallel_tool_calls=True),
     instrument=True,
     retries=2
@@ -191,11 +470,64 @@ lead_agent = Agent(
 
 @lead_agent.instructions
 def lead_agent_instruction(ctx: RunContext[AgentDeps]):
-    return lead_agent_prompt.replace("{{.CurrentDate}}", ctx.deps.current_date)
+    prompt = lead_agent_prompt.replace("{{.CurrentDate}}", ctx.deps.current_date)
+    if ctx.deps.subagents.streaming:
+        # run_blocking_subagent is hidden in streaming mode; point the lead at start/wait/cancel instead
+        prompt = prompt.replace("run_blocking_subagent", "start_subagent") + lead_agent_streaming_addendum
+    return prompt
 
 
-@lead_agent.tool_plain
-async def run_blocking_subagent(prompt: str):
+async def run_subagent(
+    deps: AgentDeps,
+    prompt: str,
+    agent_id: str | None = None,
+    on_event: Callable[[str], None] | None = None,
+    tool_call_id: str | None = None
+) -> Findings:
+    """
+    Run one subagent to completion, reporting each tool call it makes to `on_event`.
+    
+    Its output is normalized into a bounded Findings record and checkpointed
+    under the lead's `tool_call_id`. A subagent that already finished for the
+    same tool call in an earlier attempt of the run is not run again; its saved
+    findings are returned instead.
+    """
+    saved = deps.checkpoints.subagent_result(deps.run_id, tool_call_id) if tool_call_id else None
+    if saved is not None:
+        return Findings.from_json(saved)
+    agent_id = agent_id or deps.evidence.next_agent_id()
+    sub_deps = SubAgentDeps.from_parent(deps, agent_id=agent_id)
+    deps.metrics.subagent_started(agent_id)
+    try:
+        async with sub_agent.iter(
+            prompt,
+            deps=sub_deps,
+            model=deps.scheduler.wrap_model(sub_agent.model, SUBAGENT_PRIORITY, deps.metrics, agent_id),
+        ) as agent_run:
+            async for node in agent_run:
+                if on_event is not None and Agent.is_call_tools_node(node):
+                    for part in node.model_response.parts:
+                        if isinstance(part, ToolCallPart):
+                            on_event(f"{part.tool_name} {part.args_as_json_str()}")
+    finally:
+        deps.metrics.subagent_finished(agent_id)
+        await deps.prefetcher.cancel(agent_id)
+    deps.subagent_usage.incr(agent_run.result.usage())
+    findings = normalize_findings(agent_id, agent_run.result.output, deps.evidence.urls_read(agent_id))
+    if tool_call_id:
+        deps.checkpoints.save_subagent_result(deps.run_id, tool_call_id, agent_id, findings.to_json())
+    return findings
+
+
+async def blocking_mode(ctx: RunContext[AgentDeps], tool_def: ToolDefinition) -> ToolDefinition | None:
+    return None if ctx.deps.subagents.streaming else tool_def
+
+async def streaming_mode(ctx: RunContext[AgentDeps], tool_def: ToolDefinition) -> ToolDefinition | None:
+    return tool_def if ctx.deps.subagents.streaming else None
+
+
+@lead_agent.tool(prepare=blocking_mode)
+async def run_blocking_subagent(ctx: RunContext[AgentDeps], prompt: str) -> str:
     """
     Deploy a research subagent to perform specific research tasks with web search and fetch capabilities.
     
@@ -204,13 +536,243 @@ async def run_blocking_subagent(prompt: str):
                 expected output format, scope boundaries, and suggested sources
                 
     Returns:
-        str: Research findings and analysis from the subagent
+        str: XML findings from the subagent: a summary, claims with their sources, and confidence
         
     Usage: Provide clear, specific instructions. Deploy multiple subagents in parallel for
             independent research streams. Always deploy at least 1 subagent per query.
     """
-    result = await sub_agent.run(prompt, deps=SubAgentDeps())
-    return result
+    findings = await run_subagent(ctx.deps, prompt, tool_call_id=ctx.tool_call_id)
+    ctx.deps.history.remember(ctx.tool_call_id, findings.to_xml(compact=True))
+    return findings.to_xml()
+
+
+def start_background_subagent(deps: AgentDeps, agent_id: str, prompt: str, tool_call_id: str | None) -> None:
+    deps.subagents.start(
+        agent_id,
+        prompt,
+        lambda on_event: run_subagent(deps, prompt, agent_id, on_event, tool_call_id),
+    )
+
+
+ID_RE = re.compile(r"<id>([^<]+)</id>")
+RESULT_ID_RE = re.compile(r"<result>\s*<id>([^<]+)</id>")
+
+
+def resume_subagents(deps: AgentDeps, messages: list[ModelMessage]) -> None:
+    """
+    Pick up the subagents of a resumed run.
+
+    IDs used by earlier attempts are reserved so new subagents do not reuse
+    them. Background subagents the lead started but never collected or
+    cancelled are started again under their original ID and tool call ID:
+    finished ones replay their saved findings, the rest run again, and the
+    lead's next wait_for_subagents returns them.
+    """
+    for agent_id in deps.checkpoints.subagent_ids(deps.run_id):
+        deps.evidence.reserve_agent_id(agent_id)
+
+    prompts, started, collected = {}, {}, set()
+    for message in messages:
+        for part in message.parts:
+            if isinstance(part, ToolCallPart) and part.tool_name == "start_subagent":
+                prompts[part.tool_call_id] = part.args_as_dict().get("prompt", "")
+            elif isinstance(part, ToolReturnPart) and isinstance(part.content, str):
+                if part.tool_name == "start_subagent" and (match := ID_RE.search(part.content)):
+                    started[part.tool_call_id] = match.group(1)
+                elif part.tool_name == "wait_for_subagents":
+                    collected.update(RESULT_ID_RE.findall(part.content))
+                elif part.tool_name == "cancel_subagents":
+                    collected.update(ID_RE.findall(part.content))
+
+    for agent_id in started.values():
+        deps.evidence.reserve_agent_id(agent_id)
+    for tool_call_id, agent_id in started.items():
+        if agent_id not in collected and tool_call_id in prompts:
+            start_background_subagent(deps, agent_id, prompts[tool_call_id], tool_call_id)
+
+
+@lead_agent.tool(prepare=streaming_mode)
+async def start_subagent(ctx: RunContext[AgentDeps], prompt: str) -> str:
+    """
+    Start a research subagent in the background and return immediately with its id.
+    
+    Args:
+        prompt: Detailed instructions for the subagent's research task including objectives,
+                expected output format, scope boundaries, and suggested sources
+                
+    Returns:
+        str: XML containing the id of the started subagent
+        
+    Usage: Start every independent research stream first, then call wait_for_subagents to
+            collect results as they finish. Always deploy at least 1 subagent per query.
+    """
+    agent_id = ctx.deps.evidence.next_agent_id()
+    start_background_subagent(ctx.deps, agent_id, prompt, ctx.tool_call_id)
+    return f"""<subagent_started>
+<id>{agent_id}</id>
+</subagent_started>"""
+
+
+@lead_agent.tool(prepare=streaming_mode)
+async def wait_for_subagents(ctx: RunContext[AgentDeps], timeout: float = 60, min_results: int = 1) -> str:
+    """
+    Collect results from background subagents, fastest first.
+    
+    Args:
+        timeout: Maximum seconds to wait for new results
+        min_results: Return as soon as this many new results are available
+        
+    Returns:
+        str: XML with newly finished subagent results and the progress of those still running
+        
+    Usage: Call repeatedly until no subagents are running, reading results as they arrive.
+            Use cancel_subagents for stragglers once you have enough to answer.
+    """
+    pool = ctx.deps.subagents
+    finished = await pool.wait(timeout, min_results)
+    
+    results_xml = ""
+    compact_xml = ""
+    for entry in finished:
+        if entry.status == "completed":
+            body = entry.task.result().to_xml()
+            compact_body = entry.task.result().to_xml(compact=True)
+        elif entry.status == "failed":
+            body = compact_body = f"<error>{html.escape(str(entry.task.exception()))}</error>"
+        else:
+            body = compact_body = "<error>Cancelled before finishing</error>"
+        header = f"""
+<result>
+<id>{entry.agent_id}</id>
+<status>{entry.status}</status>
+<elapsed_seconds>{entry.elapsed:.0f}</elapsed_seconds>
+"""
+        results_xml += f"{header}{body}\n</result>"
+        compact_xml += f"{header}{compact_body}\n</result>"
+    
+    running_xml = ""
+    for entry in pool.running():
+        recent = "".join(f"\n<tool_call>{html.escape(event)}</tool_call>" for event in entry.events[-3:])
+        running_xml += f"""
+<subagent>
+<id>{entry.agent_id}</id>
+<elapsed_seconds>{entry.elapsed:.0f}</elapsed_seconds>
+<tool_calls>{len(entry.events)}</tool_calls>{recent}
+</subagent>"""
+    
+    ctx.deps.history.remember(ctx.tool_call_id, f"""<subagent_results>
+<finished>{compact_xml}
+</finished>
+</subagent_results>""")
+    return f"""<subagent_results>
+<finished>{results_xml}
+</finished>
+<running>{running_xml}
+</running>
+</subagent_results>"""
+
+
+@lead_agent.tool(prepare=streaming_mode)
+async def cancel_subagents(ctx: RunContext[AgentDeps], ids: list[str] | None = None) -> str:
+    """
+    Cancel background subagents that are still running.
+    
+    Args:
+        ids: Ids of the subagents to cancel; omit to cancel every running subagent
+        
+    Returns:
+        str: XML listing the cancelled subagent ids
+    """
+    cancelled = await ctx.deps.subagents.cancel(ids)
+    ids_xml = "".join(f"\n<id>{entry.agent_id}</id>" for entry in cancelled)
+    return f"""<cancelled>{ids_xml}
+</cancelled>"""
+
+
+@dataclass
+class ResearchReport:
+    query: str
+    run_id: str
+    output: str
+    elapsed: float
+    lead_usage: Usage
+    subagent_usage: Usage
+    stats: dict
+    metrics: RunMetrics
+
+    @property
+    def usage(self) -> Usage:
+        return self.lead_usage + self.subagent_usage
+
+
+async def research(query: str, deps: AgentDeps | None = None, run_id: str | None = None) -> ResearchReport:
+    """
+    Run one research query end to end.
+    
+    Pass `deps` to share connection pools, caches and the scheduler between
+    concurrent queries; it is left open for the caller to close. Without it a
+    private set is created and closed here.
+    
+    Progress is checkpointed under `run_id` (a fresh ID when None). Calling
+    again with the ID of a run that failed or was interrupted resumes it from
+    its last checkpoint; the ID of a completed run returns its saved output.
+    Resuming needs the same checkpoint store: pass shared `deps` or set
+    CHECKPOINT_PATH, since the private deps otherwise keep checkpoints in memory
+    and discard them when this call returns.
+    """
+    configure_logfire()
+    shared = deps or AgentDeps()
+    run_deps = shared.for_query(run_id)
+    checkpoints = run_deps.checkpoints
+    start = time.perf_counter()
+    try:
+        checkpoint = checkpoints.begin(run_deps.run_id, query)
+        run_deps.attempt = checkpoint.attempt
+        if checkpoint.status == "completed":
+            output, lead_usage = checkpoint.output, Usage()
+        else:
+            if checkpoint.resumed:
+                run_deps.metrics.emit(LEAD_AGENT_ID, "resumed", run_id=run_deps.run_id, attempt=checkpoint.attempt)
+                resume_subagents(run_deps, checkpoint.messages)
+            # With a saved history the lead continues from its last pending request
+            async with lead_agent.iter(
+                None if checkpoint.messages else query,
+                message_history=checkpoint.messages or None,
+                deps=run_deps,
+                model=run_deps.scheduler.wrap_model(lead_agent.model, LEAD_PRIORITY, run_deps.metrics, LEAD_AGENT_ID),
+            ) as agent_run:
+                node = agent_run.next_node
+                if checkpoint.pending_response is not None:
+                    # Re-run the tool calls the lead already made; finished subagents replay by tool call ID
+                    node = CallToolsNode(checkpoint.pending_response)
+                while not Agent.is_end_node(node):
+                    if Agent.is_model_request_node(node):
+                        checkpoints.save_messages(run_deps.run_id, [*agent_run.ctx.state.message_history, node.request])
+                    node = await agent_run.next(node)
+                    if Agent.is_call_tools_node(node):
+                        checkpoints.save_messages(run_deps.run_id, agent_run.ctx.state.message_history)
+            output, lead_usage = agent_run.result.output, agent_run.result.usage()
+            checkpoints.complete(run_deps.run_id, output)
+    finally:
+        # Subagents that failed after the lead stopped waiting would otherwise go unreported
+        for entry in await run_deps.subagents.close():
+            run_deps.metrics.emit(entry.agent_id, "subagent_failed", error=str(entry.task.exception()))
+        run_deps.metrics.finish()
+        await run_deps.prefetcher.cancel()
+        if deps is None:
+            await shared.aclose()
+    return ResearchReport(
+        query=query,
+        run_id=run_deps.run_id,
+        output=output,
+        elapsed=time.perf_counter() - start,
+        lead_usage=lead_usage,
+        subagent_usage=run_deps.subagent_usage,
+        stats=run_deps.stats(),
+        metrics=run_deps.metrics,
+    )
 
 if __name__ == "__main__":
-    print(lead_agent.run_sync("I want to find flights going to Montreal from Lagos between September 10 and September 13. Give me the cheapest between that period.", deps=AgentDeps()).output)
\ No newline at end of file
+    report = asyncio.run(research("I want to find flights going to Montreal from Lagos between September 10 and September 13. Give me the cheapest between that period."))
+    print(report.output)
+    print(report.metrics.summary_table())
\ No newline at end of file
@@ -0,0 +1,45 @@
+from pathlib import Path
+import random
+
+
+CORPUS_DIR = Path(__file__).parent / "corpus"
+
+PAGE_SIZES = [8 * 1024, 64 * 1024, 512 * 1024, 2 * 1024 * 1024, 8 * 1024 * 1024]
+
+WORDS = (
+    "flight fare airline montreal lagos research report price schedule market "
+    "analysis source evidence data travel booking route airport carrier season"
+).split()
+
+
+def synthetic_page(size: int, seed: int = 0) -> str:
+    """Build an HTML page of roughly `size` bytes with the chrome real pages carry."""
+    rng = random.Random(seed)
+    head = (
+        "<!DOCTYPE html><html><head><title>Synthetic page</title>"
+        "<style>body { font-family: sans-serif; } .nav { color: red; }</style>"
+        "<script>window.analytics = {track: function () {}};</script></head><body>"
+        "<header><a href='/'>Home</a><nav><ul><li><a href='/a'>A</a></li><li><a href='/b'>B</a></li></ul></nav></header>"
+    )
+    tail = "<aside>Related links</aside><footer>&copy; Example Inc.</footer></body></html>"
+    parts = [head]
+    length = len(head) + len(tail)
+    while length < size:
+        words = " ".join(rng.choice(WORDS) for _ in range(rng.randint(20, 80)))
+        if rng.random() < 0.1:
+            block = f"<script>var x{length} = {rng.random()};</script><div><p>{words} &amp; more</p></div>"
+        else:
+            block = f"<article><h2>{rng.choice(WORDS).title()}</h2><p>{words}.</p></article>"
+        parts.append(block)
+        length += len(block)
+    parts.append(tail)
+    return "".join(parts)
+
+
+def load_corpus(directory: Path = CORPUS_DIR) -> dict[str, bytes]:
+    """Load stored pages, generating a synthetic set on first use."""
+    if not directory.exists() or not any(directory.glob("*.html")):
+        directory.mkdir(parents=True, exist_ok=True)
+        for i, size in enumerate(PAGE_SIZES):
+            (directory / f"synthetic_{size // 1024}k.html").write_text(synthetic_page(size, seed=i), encoding="utf-8")
+    return {path.name: path.read_bytes() for path in sorted(directory.glob("*.html"))}
@@ -0,0 +1,104 @@
+"""
+Compare the bytes and tokens each tool result format sends to the model.
+
+Run from the deep-research directory:
+
+    python -m benchmarks.encoding_benchmark [--results 10] [--repeat 200]
+
+Search results mimic Brave's (snippets with <strong> markup and entities,
+tracking parameters, duplicate URLs) and pages are extracted and compressed
+from the synthetic corpus, as web_fetch would hand them over. Tokens are
+counted with tiktoken when it is installed, otherwise estimated.
+"""
+import argparse
+import random
+import statistics
+import time
+
+from benchmarks.corpus import WORDS, synthetic_page
+from compression import ContentCompressor, estimate_tokens
+from encoders import FORMATS, ResultEncoder, dedupe_results
+from extraction import extract_text_content
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+
+def token_counter():
+    if tiktoken is None:
+        return estimate_tokens, "estimated (len/4)"
+    encoding = tiktoken.get_encoding("o200k_base")
+    return lambda text: len(encoding.encode(text)), "tiktoken o200k_base"
+
+
+def search_results(count: int, seed: int = 0) -> list[dict]:
+    """Brave-style results, a fifth of them duplicates of earlier ones under a different URL form."""
+    rng = random.Random(seed)
+    results = []
+    for i in range(count):
+        if results and rng.random() < 0.2:
+            duplicate = dict(rng.choice(results))
+            duplicate["url"] = duplicate["url"].replace("https://www.", "https://").replace("?", "/?", 1)
+            results.append(duplicate)
+            continue
+        words = [rng.choice(WORDS) for _ in range(rng.randint(25, 40))]
+        words[3] = f"<strong>{words[3]}</strong>"
+        results.append({
+            "title": f"{' '.join(words[:6]).title()} &amp; {rng.choice(WORDS)} | Example News",
+            "url": f"https://www.example{i % 7}.com/{'/'.join(words[4:7])}/{i}?utm_source=brave&utm_medium=search&id={i}",
+            "description": f"{' '.join(words[6:])} &#x27;{rng.choice(WORDS)}&#x27; &quot;quoted&quot; &amp; more.",
+        })
+    return results
+
+
+def measure(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--results", type=int, default=10, help="Search results per query")
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    count_tokens, counter_name = token_counter()
+    searches = [search_results(args.results, seed) for seed in range(args.queries)]
+    kept = sum(len(dedupe_results(results)) for results in searches)
+    compressor = ContentCompressor()
+    pages = [
+        compressor.compress(extract_text_content(synthetic_page(64 * 1024, seed)), "montreal flight price").text
+        for seed in range(args.pages)
+    ]
+
+    print(f"Tokens: {counter_name}; {kept} of {args.results * args.queries} search results kept after deduplication\n")
+    print(f"{'format':<13}{'B/result':>10}{'tok/result':>12}{'B/page':>9}{'tok/page':>10}{'search us':>11}{'fetch us':>10}")
+    for name in FORMATS:
+        encoder = ResultEncoder(name)
+        search_outputs = [encoder.search(f"query {i}", results) for i, results in enumerate(searches)]
+        page_outputs = [
+            encoder.fetch(f"https://www.example.com/page/{i}?utm_source=brave", 200, text, "Showing the 10 of 40 passages most relevant to your task")
+            for i, text in enumerate(pages)
+        ]
+        search_time = measure(lambda: encoder.search("query", searches[0]), args.repeat)
+        fetch_time = measure(lambda: encoder.fetch("https://example.com/page", 200, pages[0]), args.repeat)
+        print(
+            f"{name:<13}"
+            f"{sum(len(output.encode()) for output in search_outputs) / kept:>10.0f}"
+            f"{sum(count_tokens(output) for output in search_outputs) / kept:>12.1f}"
+            f"{sum(len(output.encode()) for output in page_outputs) / len(pages):>9.0f}"
+            f"{sum(count_tokens(output) for output in page_outputs) / len(pages):>10.0f}"
+            f"{search_time * 1e6:>11.1f}{fetch_time * 1e6:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
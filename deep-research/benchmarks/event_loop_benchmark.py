@@ -0,0 +1,89 @@
+"""
+Measure event loop blocking caused by page extraction in each executor mode.
+
+Run from the deep-research directory:
+
+    python -m benchmarks.event_loop_benchmark [--corpus DIR] [--copies N]
+
+Serves the corpus from a local aiohttp server, fetches every page `copies`
+times concurrently through TextExtractor, and reports how long the event loop
+was stalled. "inline-soup" is the original path: the full body parsed with
+BeautifulSoup on the loop.
+"""
+from pathlib import Path
+import argparse
+import asyncio
+import time
+
+from aiohttp import web
+
+from benchmarks.corpus import CORPUS_DIR, load_corpus
+from benchmarks.loop_lag import LoopLagMonitor
+from connections import ConnectionPool
+from extraction import ExtractionSettings, TextExtractor
+
+
+MODES = {
+    "inline-soup": ExtractionSettings(executor="inline", streaming=False),
+    "inline-stream": ExtractionSettings(executor="inline"),
+    "thread": ExtractionSettings(executor="thread"),
+    "process": ExtractionSettings(executor="process"),
+}
+
+
+async def serve_corpus(pages: dict[str, bytes]) -> tuple[web.AppRunner, str]:
+    async def handler(request: web.Request) -> web.Response:
+        return web.Response(body=pages[request.match_info["name"]], content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/{name}", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+async def run_mode(base_url: str, names: list[str], settings: ExtractionSettings, copies: int) -> dict:
+    extractor = TextExtractor(settings)
+    monitor = LoopLagMonitor()
+    async with ConnectionPool() as pool:
+        async def fetch(name: str) -> int:
+            async with pool.session.get(f"{base_url}/{name}") as response:
+                return len(await extractor.extract_response(response))
+
+        # Warm up executor workers so start-up cost is not counted as blocking
+        await fetch(names[0])
+        monitor.start()
+        start = time.perf_counter()
+        await asyncio.gather(*(fetch(name) for name in names for _ in range(copies)))
+        wall = time.perf_counter() - start
+        await monitor.stop()
+    extractor.close()
+    return {"wall_ms": wall * 1000, **monitor.summary()}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--corpus", type=Path, default=CORPUS_DIR)
+    parser.add_argument("--copies", type=int, default=4)
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=list(MODES))
+    args = parser.parse_args()
+
+    pages = load_corpus(args.corpus)
+    runner, base_url = await serve_corpus(pages)
+    try:
+        print(f"{'mode':<16}{'wall ms':>10}{'max lag ms':>12}{'p99 lag ms':>12}{'blocked ms':>12}")
+        for mode in args.modes:
+            result = await run_mode(base_url, list(pages), MODES[mode], args.copies)
+            print(
+                f"{mode:<16}{result['wall_ms']:>10.0f}{result['max_ms']:>12.1f}"
+                f"{result['p99_ms']:>12.1f}{result['blocked_ms']:>12.0f}"
+            )
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
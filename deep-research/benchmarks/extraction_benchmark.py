@@ -0,0 +1,59 @@
+"""
+Compare full-document BeautifulSoup extraction against streaming extraction.
+
+Run from the deep-research directory:
+
+    python -m benchmarks.extraction_benchmark [--corpus DIR] [--max-chars N]
+
+Drop real saved pages (*.html) into the corpus directory to benchmark them;
+otherwise a synthetic set of pages of increasing size is generated.
+"""
+from pathlib import Path
+import argparse
+import statistics
+import time
+import tracemalloc
+
+from benchmarks.corpus import CORPUS_DIR, load_corpus
+from extraction import ExtractionSettings, extract_text_content, extract_text_from_chunks
+
+
+def measure(fn, repeat: int) -> tuple[float, int, str]:
+    """Return median seconds, peak traced bytes and the output of `fn`."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = fn()
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(timings), peak, output
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--corpus", type=Path, default=CORPUS_DIR)
+    parser.add_argument("--max-chars", type=int, default=ExtractionSettings().max_text_chars)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    chunk_size = ExtractionSettings().chunk_size
+    print(f"{'page':<28}{'size':>10}{'soup ms':>10}{'stream ms':>11}{'soup MB':>10}{'stream MB':>11}{'chars':>10}")
+    for name, body in load_corpus(args.corpus).items():
+        chunks = [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)]
+        soup_time, soup_peak, _ = measure(
+            lambda: extract_text_content(body.decode("utf-8", errors="replace")), args.repeat
+        )
+        stream_time, stream_peak, text = measure(
+            lambda: extract_text_from_chunks(chunks, "utf-8", args.max_chars), args.repeat
+        )
+        print(
+            f"{name:<28}{len(body) // 1024:>9}k{soup_time * 1000:>10.1f}{stream_time * 1000:>11.1f}"
+            f"{soup_peak / 2**20:>10.1f}{stream_peak / 2**20:>11.1f}{len(text):>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
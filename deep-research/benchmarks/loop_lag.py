@@ -0,0 +1,44 @@
+from dataclasses import dataclass, field
+import asyncio
+import time
+
+
+@dataclass
+class LoopLagMonitor:
+    """
+    Measures how long the event loop is blocked.
+
+    A background task repeatedly sleeps for `interval`; any time beyond that
+    before it wakes up again is time the loop spent running something else
+    without yielding.
+    """
+    interval: float = 0.005
+    lags: list[float] = field(default_factory=list)
+    _task: asyncio.Task | None = field(default=None, init=False, repr=False)
+
+    async def _run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.lags.append(max(0.0, time.perf_counter() - start - self.interval))
+
+    def start(self) -> None:
+        self.lags.clear()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def summary(self) -> dict:
+        lags = sorted(self.lags) or [0.0]
+        return {
+            "max_ms": lags[-1] * 1000,
+            "p99_ms": lags[min(len(lags) - 1, int(len(lags) * 0.99))] * 1000,
+            "blocked_ms": sum(lag for lag in lags if lag > self.interval) * 1000,
+        }
@@ -0,0 +1,159 @@
+"""
+Local stand-ins for everything the research pipeline talks to.
+
+- A fake Brave Search endpoint returning deterministic results
+- A static page server with injectable latency and pages of varied sizes
+- Scripted FunctionModels for the lead agent and subagents that issue the
+  same tool calls a real model would, without calling an LLM
+"""
+from collections import Counter
+from dataclasses import dataclass, field
+import asyncio
+import hashlib
+import random
+import re
+
+from aiohttp import web
+from pydantic_ai.messages import ModelMessage, ModelResponse, TextPart, ToolCallPart, ToolReturnPart, UserPromptPart
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+
+from benchmarks.corpus import synthetic_page
+
+
+@dataclass
+class MockServices:
+    """
+    Fake Brave and page server on a random local port.
+
+    Args:
+        page_count: Number of distinct pages served
+        page_sizes: Byte sizes cycled through when generating pages
+        search_latency: Seconds added to every search response
+        page_latency: Seconds added to every page response
+        jitter: Random extra latency, as a fraction of the base latency
+    """
+    page_count: int = 50
+    page_sizes: tuple[int, ...] = (16 * 1024, 64 * 1024, 256 * 1024, 1024 * 1024)
+    search_latency: float = 0.05
+    page_latency: float = 0.1
+    jitter: float = 0.5
+    requests: Counter = field(default_factory=Counter)
+    base_url: str = ""
+    _pages: list[bytes] = field(default_factory=list, init=False, repr=False)
+    _runner: web.AppRunner | None = field(default=None, init=False, repr=False)
+
+    async def _delay(self, latency: float) -> None:
+        await asyncio.sleep(latency * (1 + random.random() * self.jitter))
+
+    async def search(self, request: web.Request) -> web.Response:
+        self.requests["search"] += 1
+        await self._delay(self.search_latency)
+        query = request.query.get("q", "")
+        count = int(request.query.get("count", 10))
+        # Overlapping queries map to overlapping pages, like a real index
+        seed = int(hashlib.sha256(" ".join(sorted(query.lower().split()[:3])).encode()).hexdigest(), 16)
+        results = [
+            {
+                "title": f"Result {i} for {query}",
+                "url": f"{self.base_url}/page/{(seed + i) % self.page_count}",
+                "description": f"Snippet {i} about {query} & related topics.",
+            }
+            for i in range(count)
+        ]
+        return web.json_response({"web": {"results": results}})
+
+    async def page(self, request: web.Request) -> web.Response:
+        self.requests["page"] += 1
+        await self._delay(self.page_latency)
+        body = self._pages[int(request.match_info["index"]) % self.page_count]
+        return web.Response(body=body, content_type="text/html", headers={"Cache-Control": "max-age=300"})
+
+    async def start(self) -> str:
+        self._pages = [
+            synthetic_page(self.page_sizes[i % len(self.page_sizes)], seed=i).encode()
+            for i in range(self.page_count)
+        ]
+        app = web.Application()
+        app.router.add_get("/res/v1/web/search", self.search)
+        app.router.add_get("/page/{index}", self.page)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, "127.0.0.1", 0).start()
+        self.base_url = f"http://127.0.0.1:{self._runner.addresses[0][1]}"
+        return self.base_url
+
+    @property
+    def search_url(self) -> str:
+        return f"{self.base_url}/res/v1/web/search"
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+def _first_prompt(messages: list[ModelMessage]) -> str:
+    for message in messages:
+        for part in message.parts:
+            if isinstance(part, UserPromptPart) and isinstance(part.content, str):
+                return part.content
+    return ""
+
+
+def _responses(messages: list[ModelMessage]) -> int:
+    return sum(isinstance(message, ModelResponse) for message in messages)
+
+
+@dataclass
+class ScriptedModels:
+    """
+    FunctionModels that drive the lead and subagents through a fixed plan.
+
+    The lead fans out to `width` subagents and then answers. Each subagent
+    searches once, fetches its top `fetches` results, then reports back.
+
+    Args:
+        width: Subagents started by the lead agent
+        fetches: Pages fetched by each subagent
+        latency: Seconds each simulated model call takes
+    """
+    width: int = 5
+    fetches: int = 3
+    latency: float = 0.2
+    tool_calls: Counter = field(default_factory=Counter)
+
+    def _call(self, tool_name: str, args: dict) -> ToolCallPart:
+        self.tool_calls[tool_name] += 1
+        return ToolCallPart(tool_name, args)
+
+    async def lead(self, messages: list[ModelMessage], info: AgentInfo) -> ModelResponse:
+        await asyncio.sleep(self.latency)
+        query = _first_prompt(messages)
+        if _responses(messages) == 0:
+            return ModelResponse(parts=[
+                self._call("run_blocking_subagent", {"prompt": f"Research angle {i} of: {query}"})
+                for i in range(self.width)
+            ])
+        return ModelResponse(parts=[TextPart(f"Final report for: {query}")])
+
+    async def subagent(self, messages: list[ModelMessage], info: AgentInfo) -> ModelResponse:
+        await asyncio.sleep(self.latency)
+        task = _first_prompt(messages)
+        step = _responses(messages)
+        if step == 0:
+            return ModelResponse(parts=[self._call("web_search", {"query": task, "count": 10})])
+        if step == 1:
+            returns = [
+                part.content for message in messages for part in message.parts
+                if isinstance(part, ToolReturnPart) and part.tool_name == "web_search"
+            ]
+            urls = re.findall(r"<url>(.*?)</url>", str(returns[-1]) if returns else "")
+            if urls:
+                return ModelResponse(parts=[self._call("web_fetch", {"url": url}) for url in urls[:self.fetches]])
+        return ModelResponse(parts=[TextPart(f"Findings for: {task}")])
+
+    def lead_model(self) -> FunctionModel:
+        return FunctionModel(self.lead, model_name="scripted-lead")
+
+    def subagent_model(self) -> FunctionModel:
+        return FunctionModel(self.subagent, model_name="scripted-subagent")
@@ -0,0 +1,161 @@
+"""
+Offline end-to-end benchmark of lead agent -> subagents -> web_search/web_fetch.
+
+Run from the deep-research directory:
+
+    python -m benchmarks.pipeline_benchmark [--widths 1 5 10 20] [--queries 8]
+
+Nothing leaves the machine: Brave and the web are served by a local mock
+server and both agents run scripted FunctionModels with a fixed per-call
+latency. Each fan-out width runs in its own subprocess so peak RSS is measured
+per width; it includes the extraction workers' peak RSS, read from /proc
+before they exit, so the process executor's parsing memory is counted.
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+# Offline defaults: no Logfire export, no console spans, and a placeholder key so
+# the OpenAI models can be constructed before they are swapped out
+os.environ.setdefault("LOGFIRE_SEND_TO_LOGFIRE", "false")
+os.environ.setdefault("LOGFIRE_CONSOLE", "false")
+os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def run_width(args: argparse.Namespace) -> dict:
+    from benchmarks.mock_services import MockServices, ScriptedModels
+
+    services = MockServices(search_latency=args.search_latency, page_latency=args.page_latency)
+    await services.start()
+    os.environ["BRAVE_SEARCH_URL"] = services.search_url
+
+    import agents
+    from extraction import ExtractionSettings, TextExtractor, extract_text_from_chunks
+    from fetcher import Fetcher
+    from prefetch import Prefetcher
+    from scheduler import Lane, Scheduler
+
+    models = ScriptedModels(width=args.width, fetches=args.fetches, latency=args.model_latency)
+    # Assigned rather than overridden so model calls still go through the scheduler
+    agents.lead_agent.model = models.lead_model()
+    agents.sub_agent.model = models.subagent_model()
+
+    deps = agents.AgentDeps(
+        extractor=TextExtractor(ExtractionSettings(executor=args.executor)),
+        scheduler=Scheduler(search=Lane("search", limit=4, rate=args.search_rate, burst=max(1, int(args.search_rate or 1)))),
+        prefetcher=Prefetcher(enabled=args.prefetch),
+        fetcher=Fetcher(hedge=args.hedge),
+    )
+    slots = asyncio.Semaphore(args.concurrency)
+    latencies = []
+
+    async def one(i: int) -> None:
+        async with slots:
+            report = await agents.research(f"benchmark query {i} about topic {i % 3}", deps)
+            latencies.append(report.elapsed)
+
+    # Start executor workers up front so their start-up is not charged to the first queries
+    await asyncio.gather(*(
+        deps.extractor.run(extract_text_from_chunks, [b"<p>warm up</p>"], None, 100)
+        for _ in range(deps.extractor.settings.workers)
+    ))
+
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(*(one(i) for i in range(args.queries)))
+    finally:
+        wall = time.perf_counter() - start
+        worker_rss_kb = worker_peak_rss_kb(deps.extractor._executor)
+        await deps.aclose()
+        await services.stop()
+
+    return {
+        "width": args.width,
+        "queries": args.queries,
+        "queries_per_sec": round(args.queries / wall, 3),
+        "p50_s": round(statistics.median(latencies), 3),
+        "p99_s": round(percentile(latencies, 0.99), 3),
+        "tool_calls_per_query": round(sum(models.tool_calls.values()) / args.queries, 1),
+        "http_requests": dict(services.requests),
+        "peak_rss_mb": round((resource.getrusage(resource.RUSAGE_SELF).ru_maxrss + worker_rss_kb) / 1024, 1),
+        "worker_peak_rss_mb": round(worker_rss_kb / 1024, 1),
+    }
+
+
+def worker_peak_rss_kb(executor) -> int:
+    """Summed peak RSS of a process pool's workers (Linux only; 0 for thread pools)."""
+    total = 0
+    for pid in getattr(executor, "_processes", None) or {}:
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                total += next(int(line.split()[1]) for line in f if line.startswith("VmHWM:"))
+        except (OSError, StopIteration):
+            continue
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--widths", type=int, nargs="+", default=[1, 5, 10, 20])
+    parser.add_argument("--queries", type=int, default=8)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--fetches", type=int, default=3, help="Pages fetched per subagent")
+    parser.add_argument("--model-latency", type=float, default=0.2)
+    parser.add_argument("--search-latency", type=float, default=0.05)
+    parser.add_argument("--page-latency", type=float, default=0.1)
+    parser.add_argument("--search-rate", type=float, default=None, help="Searches per second per key, unlimited by default")
+    parser.add_argument("--executor", default="process", choices=["process", "thread", "inline"])
+    parser.add_argument("--prefetch", action="store_true", help="Prefetch top search results")
+    parser.add_argument("--hedge", action="store_true", help="Hedge slow page fetches")
+    parser.add_argument("--width", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.width is not None:
+        result = asyncio.run(run_width(args))
+        print(json.dumps(result))
+        return
+
+    print(f"{'width':>6}{'q/s':>8}{'p50 s':>8}{'p99 s':>8}{'tools/q':>9}{'searches':>10}{'pages':>7}{'RSS MB':>8}{'workers':>9}")
+    forwarded = _strip_widths(sys.argv[1:])
+    for width in args.widths:
+        completed = subprocess.run(
+            [sys.executable, "-m", "benchmarks.pipeline_benchmark", "--width", str(width),
+             *forwarded],
+            capture_output=True, text=True, check=True,
+        )
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        requests = result["http_requests"]
+        print(
+            f"{width:>6}{result['queries_per_sec']:>8.2f}{result['p50_s']:>8.2f}{result['p99_s']:>8.2f}"
+            f"{result['tool_calls_per_query']:>9.1f}{requests.get('search', 0):>10}{requests.get('page', 0):>7}"
+            f"{result['peak_rss_mb']:>8.0f}{result['worker_peak_rss_mb']:>9.0f}"
+        )
+
+
+def _strip_widths(argv: list[str]) -> list[str]:
+    """Drop `--widths` and its values so subprocesses only see their own width."""
+    stripped, skipping = [], False
+    for arg in argv:
+        if arg == "--widths":
+            skipping = True
+            continue
+        if skipping and not arg.startswith("--"):
+            continue
+        skipping = False
+        stripped.append(arg)
+    return stripped
+
+
+if __name__ == "__main__":
+    main()
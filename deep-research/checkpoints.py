@@ -0,0 +1,199 @@
+from dataclasses import dataclass, field
+import json
+import sqlite3
+import time
+
+from pydantic_ai.messages import ModelMessage, ModelMessagesTypeAdapter, ModelResponse
+
+
+@dataclass
+class RunCheckpoint:
+    run_id: str
+    query: str
+    attempt: int
+    status: str
+    messages: list[ModelMessage]
+    output: str | None = None
+
+    @property
+    def resumed(self) -> bool:
+        return self.attempt > 1
+
+    @property
+    def pending_response(self) -> ModelResponse | None:
+        """The lead's last response, whose tool calls had not all returned when the run stopped."""
+        if self.messages and isinstance(self.messages[-1], ModelResponse):
+            return self.messages[-1]
+        return None
+
+
+@dataclass
+class CheckpointStats:
+    runs_resumed: int = 0
+    lead_checkpoints: int = 0
+    subagents_saved: int = 0
+    subagents_replayed: int = 0
+    tool_outputs_saved: int = 0
+    tool_outputs_replayed: int = 0
+
+    def as_dict(self) -> dict:
+        return {
+            "runs_resumed": self.runs_resumed,
+            "lead_checkpoints": self.lead_checkpoints,
+            "subagents_saved": self.subagents_saved,
+            "subagents_replayed": self.subagents_replayed,
+            "tool_outputs_saved": self.tool_outputs_saved,
+            "tool_outputs_replayed": self.tool_outputs_replayed,
+        }
+
+
+@dataclass
+class CheckpointStore:
+    """
+    Progress of research runs, saved as it happens and keyed by run ID.
+
+    The lead agent's message history is saved before every model request and
+    after every model response, along with each completed subagent result
+    (keyed by the lead's tool call ID) and each subagent tool output. Starting a
+    run with an ID that did not finish resumes it: the lead picks up from its
+    last saved history, re-running the tool calls of a saved response rather
+    than asking the model again, and subagent results and tool outputs from
+    earlier attempts are replayed instead of being paid for again. Once a run
+    completes only its final output is kept.
+
+    Args:
+        db_path: SQLite file to keep checkpoints in; in memory when None, which
+            only helps runs retried within the same process
+    """
+    db_path: str | None = None
+    stats: CheckpointStats = field(default_factory=CheckpointStats)
+    _db: sqlite3.Connection | None = field(default=None, init=False, repr=False)
+
+    def __post_init__(self):
+        self._db = sqlite3.connect(self.db_path or ":memory:")
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS runs (
+                run_id TEXT PRIMARY KEY,
+                query TEXT NOT NULL,
+                attempt INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                messages TEXT,
+                output TEXT,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS subagent_findings (
+                run_id TEXT NOT NULL,
+                tool_call_id TEXT NOT NULL,
+                agent_id TEXT NOT NULL,
+                output TEXT NOT NULL,
+                PRIMARY KEY (run_id, tool_call_id)
+            );
+            CREATE TABLE IF NOT EXISTS tool_outputs (
+                run_id TEXT NOT NULL,
+                tool TEXT NOT NULL,
+                args TEXT NOT NULL,
+                attempt INTEGER NOT NULL,
+                output TEXT NOT NULL,
+                PRIMARY KEY (run_id, tool, args)
+            );
+            """
+        )
+        self._db.commit()
+
+    def begin(self, run_id: str, query: str) -> RunCheckpoint:
+        """Start a new attempt of `run_id`, returning whatever earlier attempts saved."""
+        row = self._db.execute(
+            "SELECT query, attempt, status, messages, output FROM runs WHERE run_id = ?", (run_id,)
+        ).fetchone()
+        if row is None:
+            checkpoint = RunCheckpoint(run_id, query, 1, "running", [])
+        else:
+            saved_query, attempt, status, messages, output = row
+            if saved_query != query:
+                raise ValueError(f"Run {run_id} was started for a different query")
+            if status == "completed":
+                return RunCheckpoint(run_id, query, attempt, status, [], output)
+            history = ModelMessagesTypeAdapter.validate_json(messages) if messages else []
+            checkpoint = RunCheckpoint(run_id, query, attempt + 1, "running", history)
+            self.stats.runs_resumed += 1
+
+        self._db.execute(
+            "INSERT INTO runs (run_id, query, attempt, status, updated_at) VALUES (?, ?, ?, 'running', ?) "
+            "ON CONFLICT (run_id) DO UPDATE SET attempt = excluded.attempt, status = 'running', updated_at = excluded.updated_at",
+            (run_id, query, checkpoint.attempt, time.time()),
+        )
+        self._db.commit()
+        return checkpoint
+
+    def save_messages(self, run_id: str, messages: list[ModelMessage]) -> None:
+        """Save the lead agent's history; a resumed run continues from the last one saved."""
+        self._db.execute(
+            "UPDATE runs SET messages = ?, updated_at = ? WHERE run_id = ?",
+            (ModelMessagesTypeAdapter.dump_json(messages).decode(), time.time(), run_id),
+        )
+        self._db.commit()
+        self.stats.lead_checkpoints += 1
+
+    def subagent_result(self, run_id: str, tool_call_id: str) -> str | None:
+        """The saved result of the subagent the lead started with `tool_call_id`."""
+        row = self._db.execute(
+            "SELECT output FROM subagent_findings WHERE run_id = ? AND tool_call_id = ?", (run_id, tool_call_id)
+        ).fetchone()
+        if row is None:
+            return None
+        self.stats.subagents_replayed += 1
+        return row[0]
+
+    def subagent_ids(self, run_id: str) -> list[str]:
+        """Agent IDs of the subagents whose results earlier attempts of the run saved."""
+        rows = self._db.execute("SELECT agent_id FROM subagent_findings WHERE run_id = ?", (run_id,)).fetchall()
+        return [row[0] for row in rows]
+
+    def save_subagent_result(self, run_id: str, tool_call_id: str, agent_id: str, output: str) -> None:
+        self._db.execute(
+            "INSERT OR REPLACE INTO subagent_findings (run_id, tool_call_id, agent_id, output) VALUES (?, ?, ?, ?)",
+            (run_id, tool_call_id, agent_id, output),
+        )
+        self._db.commit()
+        self.stats.subagents_saved += 1
+
+    def tool_output(self, run_id: str, attempt: int, tool: str, args: dict) -> str | None:
+        """A tool output saved by an earlier attempt of the run for the same arguments."""
+        row = self._db.execute(
+            "SELECT output FROM tool_outputs WHERE run_id = ? AND tool = ? AND args = ? AND attempt < ?",
+            (run_id, tool, json.dumps(args, sort_keys=True), attempt),
+        ).fetchone()
+        if row is None:
+            return None
+        self.stats.tool_outputs_replayed += 1
+        return row[0]
+
+    def save_tool_output(self, run_id: str, attempt: int, tool: str, args: dict, output: str) -> None:
+        self._db.execute(
+            "INSERT OR IGNORE INTO tool_outputs (run_id, tool, args, attempt, output) VALUES (?, ?, ?, ?, ?)",
+            (run_id, tool, json.dumps(args, sort_keys=True), attempt, output),
+        )
+        self._db.commit()
+        self.stats.tool_outputs_saved += 1
+
+    def complete(self, run_id: str, output: str) -> None:
+        """Mark the run finished, keeping its output and dropping its intermediate state."""
+        self._db.execute(
+            "UPDATE runs SET status = 'completed', messages = NULL, output = ?, updated_at = ? WHERE run_id = ?",
+            (output, time.time(), run_id),
+        )
+        self._db.execute("DELETE FROM subagent_findings WHERE run_id = ?", (run_id,))
+        self._db.execute("DELETE FROM tool_outputs WHERE run_id = ?", (run_id,))
+        self._db.commit()
+
+    def discard(self, run_id: str) -> None:
+        """Forget a run so its ID starts from scratch."""
+        for table in ("runs", "subagent_findings", "tool_outputs"):
+            self._db.execute(f"DELETE FROM {table} WHERE run_id = ?", (run_id,))
+        self._db.commit()
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
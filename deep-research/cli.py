@@ -0,0 +1,191 @@
+"""
+Run research queries from the command line.
+
+    python cli.py "What are the cheapest flights from Lagos to Montreal?"
+    python cli.py --batch queries.jsonl --out reports --concurrency 4
+
+Batch files are JSONL (one object per line with an `id`/`request_id` and a
+`query`, `prompt` or `title`/`body`) or plain text with one query per line.
+Each report is written to `<out>/<id>.md` as soon as it finishes, with its
+run metrics in `<out>/<id>.metrics.json`, and a summary line is appended to
+`<out>/results.jsonl`; re-running the same batch skips queries that already
+completed. Progress is checkpointed in `<out>/checkpoints.sqlite`, so queries
+that failed or were interrupted resume where they left off on the next run.
+`--events` streams each run's structured events to stderr.
+"""
+from dataclasses import dataclass
+from pathlib import Path
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sys
+
+from agents import AgentDeps, ResearchReport, research
+from checkpoints import CheckpointStore
+from encoders import FORMATS, ResultEncoder
+from fetcher import Fetcher
+from history import HistoryCompactor
+from metrics import RunMetrics
+from prefetch import Prefetcher
+from subagents import SubagentPool
+
+
+@dataclass
+class BatchItem:
+    id: str
+    query: str
+
+    @property
+    def run_id(self) -> str:
+        """Checkpoint key: stable across restarts, and new if the query text changes."""
+        return f"{self.id}-{hashlib.sha256(self.query.encode()).hexdigest()[:12]}"
+
+
+def load_batch(path: Path) -> list[BatchItem]:
+    items = []
+    for line_number, line in enumerate(path.read_text(encoding="utf-8").splitlines(), start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            record = line
+        if isinstance(record, str):
+            items.append(BatchItem(str(line_number), record))
+            continue
+        query = record.get("query") or record.get("prompt") or "\n\n".join(
+            part for part in (record.get("title"), record.get("body")) if part
+        )
+        item_id = record.get("id") or record.get("request_id") or str(line_number)
+        items.append(BatchItem(str(item_id), query))
+    return items
+
+
+def report_path(out_dir: Path, item_id: str) -> Path:
+    return out_dir / f"{re.sub(r'[^\w.-]', '_', item_id)}.md"
+
+
+def completed_run_ids(out_dir: Path) -> set[str]:
+    """Run IDs whose report was written by an earlier run; a changed query gets a new run ID."""
+    results = out_dir / "results.jsonl"
+    if not results.exists():
+        return set()
+    done = set()
+    for line in results.read_text(encoding="utf-8").splitlines():
+        record = json.loads(line)
+        if record["status"] == "ok" and report_path(out_dir, record["id"]).exists():
+            done.add(record.get("run_id"))
+    return done
+
+
+def summary_record(item: BatchItem, report: ResearchReport | None, error: str | None = None) -> dict:
+    record = {"id": item.id, "run_id": item.run_id, "status": "ok" if report else "error"}
+    if report is not None:
+        usage = report.usage
+        record.update({
+            "elapsed_seconds": round(report.elapsed, 2),
+            "requests": usage.requests,
+            "request_tokens": usage.request_tokens,
+            "response_tokens": usage.response_tokens,
+            "total_tokens": usage.total_tokens,
+            "lead_tokens": report.lead_usage.total_tokens,
+            "subagent_tokens": report.subagent_usage.total_tokens,
+            "cache_hit_rates": report.metrics.cache_hit_rates(),
+            "tokens_saved": report.stats["compression"]["tokens_saved"],
+        })
+    if error is not None:
+        record["error"] = error
+    return record
+
+
+async def run_batch(items: list[BatchItem], out_dir: Path, concurrency: int, timeout: float | None, deps: AgentDeps) -> list[dict]:
+    """Run queries concurrently against shared deps, writing each report as it finishes."""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    slots = asyncio.Semaphore(concurrency)
+    results_file = out_dir / "results.jsonl"
+
+    async def run_one(item: BatchItem) -> dict:
+        async with slots:
+            print(f"[{item.id}] started")
+            try:
+                report = await asyncio.wait_for(research(item.query, deps, item.run_id), timeout)
+            except Exception as e:
+                record = summary_record(item, None, f"{type(e).__name__}: {e}")
+            else:
+                path = report_path(out_dir, item.id)
+                path.write_text(f"# {item.id}\n\n{report.output}\n", encoding="utf-8")
+                metrics = {**report.metrics.as_dict(), "stats": report.stats}
+                path.with_suffix(".metrics.json").write_text(json.dumps(metrics, indent=2), encoding="utf-8")
+                record = summary_record(item, report)
+            with results_file.open("a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+            print(f"[{item.id}] {record['status']} in {record.get('elapsed_seconds', '-')}s, {record.get('total_tokens', '-')} tokens")
+            return record
+
+    return await asyncio.gather(*(run_one(item) for item in items))
+
+
+async def main_async(args: argparse.Namespace) -> int:
+    if args.batch:
+        items = load_batch(args.batch)
+    elif args.query:
+        items = [BatchItem(f"query-{hashlib.sha256(args.query.encode()).hexdigest()[:8]}", args.query)]
+    else:
+        print("Provide a query or --batch FILE", file=sys.stderr)
+        return 2
+
+    if not args.force:
+        done = completed_run_ids(args.out)
+        skipped = [item for item in items if item.run_id in done]
+        items = [item for item in items if item.run_id not in done]
+        if skipped:
+            print(f"Skipping {len(skipped)} completed queries (use --force to re-run)")
+
+    args.out.mkdir(parents=True, exist_ok=True)
+    deps = AgentDeps(
+        subagents=SubagentPool(streaming=args.streaming),
+        prefetcher=Prefetcher(enabled=args.prefetch),
+        fetcher=Fetcher(hedge=args.hedge),
+        metrics=RunMetrics(echo=args.events),
+        checkpoints=CheckpointStore(db_path=str(args.checkpoints or args.out / "checkpoints.sqlite")),
+        encoder=ResultEncoder(args.result_format),
+        history=HistoryCompactor(enabled=args.compact_history),
+    )
+    if args.force:
+        for item in items:
+            deps.checkpoints.discard(item.run_id)
+    try:
+        records = await run_batch(items, args.out, args.concurrency, args.timeout, deps)
+    finally:
+        await deps.aclose()
+
+    ok = [record for record in records if record["status"] == "ok"]
+    print(f"\n{len(ok)}/{len(records)} queries completed, {sum(r['total_tokens'] or 0 for r in ok)} tokens, {sum(r['tokens_saved'] for r in ok)} saved by compression")
+    print("Shared resource stats:", json.dumps(deps.shared_stats(), indent=2))
+    return 0 if len(ok) == len(records) else 1
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run deep research queries.")
+    parser.add_argument("query", nargs="?", help="A single research query")
+    parser.add_argument("--batch", type=Path, help="JSONL or text file of queries")
+    parser.add_argument("--out", type=Path, default=Path("reports"), help="Directory for reports and results.jsonl")
+    parser.add_argument("--concurrency", type=int, default=4, help="Queries run at the same time")
+    parser.add_argument("--timeout", type=float, default=None, help="Seconds allowed per query")
+    parser.add_argument("--streaming", action="store_true", help="Use non-blocking subagents")
+    parser.add_argument("--prefetch", action="store_true", help="Fetch top search results before the model asks for them")
+    parser.add_argument("--hedge", action="store_true", help="Send a second request for page fetches slower than usual")
+    parser.add_argument("--result-format", choices=FORMATS, default=os.getenv("RESULT_FORMAT", "xml"), help="How search and page results are shown to subagents")
+    parser.add_argument("--compact-history", action="store_true", help="Compact old subagent results once the lead's context grows large")
+    parser.add_argument("--checkpoints", type=Path, help="SQLite file for run checkpoints, default <out>/checkpoints.sqlite")
+    parser.add_argument("--force", action="store_true", help="Re-run queries that already have reports")
+    parser.add_argument("--events", action="store_true", help="Print structured run events to stderr")
+    sys.exit(asyncio.run(main_async(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
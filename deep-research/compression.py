@@ -0,0 +1,137 @@
+from collections import Counter
+from dataclasses import dataclass, field
+import math
+import re
+
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for English text (about four characters per token)."""
+    return (len(text) + 3) // 4
+
+
+def tokenize(text: str) -> list[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def chunk_text(text: str, chunk_words: int) -> list[str]:
+    """Split text into passages of roughly `chunk_words` words on sentence boundaries."""
+    sentences = []
+    for sentence in re.split(r"(?<=[.!?])\s+", text):
+        words = sentence.split()
+        # Break up run-on "sentences" (tables, lists) so no passage exceeds the budget
+        for start in range(0, len(words), chunk_words):
+            sentences.append(" ".join(words[start:start + chunk_words]))
+    chunks, current, length = [], [], 0
+    for sentence in sentences:
+        words = len(sentence.split())
+        if current and length + words > chunk_words:
+            chunks.append(" ".join(current))
+            current, length = [], 0
+        current.append(sentence)
+        length += words
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+def bm25_scores(query: str, chunks: list[str], k1: float = 1.5, b: float = 0.75) -> list[float]:
+    """Score each chunk against the query with Okapi BM25, using the chunks as the corpus."""
+    query_terms = set(tokenize(query))
+    documents = [Counter(tokenize(chunk)) for chunk in chunks]
+    lengths = [sum(document.values()) for document in documents]
+    average_length = sum(lengths) / len(lengths) if lengths else 0.0
+    document_frequency = Counter(term for document in documents for term in query_terms & document.keys())
+
+    scores = []
+    for document, length in zip(documents, lengths):
+        score = 0.0
+        for term in query_terms & document.keys():
+            idf = math.log(1 + (len(documents) - document_frequency[term] + 0.5) / (document_frequency[term] + 0.5))
+            frequency = document[term]
+            score += idf * frequency * (k1 + 1) / (frequency + k1 * (1 - b + b * length / (average_length or 1)))
+        scores.append(score)
+    return scores
+
+
+@dataclass
+class CompressionStats:
+    pages: int = 0
+    compressed: int = 0
+    tokens_in: int = 0
+    tokens_out: int = 0
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_in - self.tokens_out
+
+    def as_dict(self) -> dict:
+        return {
+            "pages": self.pages,
+            "compressed": self.compressed,
+            "tokens_in": self.tokens_in,
+            "tokens_out": self.tokens_out,
+            "tokens_saved": self.tokens_saved,
+        }
+
+
+@dataclass
+class Compressed:
+    text: str
+    passages_kept: int
+    passages_total: int
+    original_tokens: int
+    passages: list[str] = field(default_factory=list)
+
+    @property
+    def truncated(self) -> bool:
+        return self.passages_kept < self.passages_total
+
+
+@dataclass
+class ContentCompressor:
+    """
+    Trims fetched pages to the passages most relevant to the research task.
+
+    Pages within `token_budget` pass through untouched. Longer pages are split
+    into passages, ranked with BM25 against the query, and the best passages
+    that fit the budget are returned in their original order.
+
+    Args:
+        enabled: Whether to compress at all
+        token_budget: Maximum estimated tokens returned per page
+        chunk_words: Approximate passage length in words
+    """
+    enabled: bool = True
+    token_budget: int = 2000
+    chunk_words: int = 120
+    stats: CompressionStats = field(default_factory=CompressionStats)
+
+    def compress(self, text: str, query: str) -> Compressed:
+        original_tokens = estimate_tokens(text)
+        self.stats.pages += 1
+        self.stats.tokens_in += original_tokens
+        if not self.enabled or original_tokens <= self.token_budget:
+            self.stats.tokens_out += original_tokens
+            return Compressed(text, 1, 1, original_tokens, [text])
+
+        chunks = chunk_text(text, self.chunk_words)
+        scores = bm25_scores(query, chunks)
+        # Best score first; earlier passages win ties
+        ranked = sorted(range(len(chunks)), key=lambda i: (-scores[i], i))
+
+        selected, used = [], 0
+        for i in ranked:
+            tokens = estimate_tokens(chunks[i])
+            if used + tokens > self.token_budget:
+                continue
+            selected.append(i)
+            used += tokens
+
+        passages = [chunks[i] for i in sorted(selected)]
+        compressed = " ... ".join(passages)
+        self.stats.compressed += 1
+        self.stats.tokens_out += estimate_tokens(compressed)
+        return Compressed(compressed, len(selected), len(chunks), original_tokens, passages)
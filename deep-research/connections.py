@@ -0,0 +1,105 @@
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+
+import aiohttp
+
+
+@dataclass
+class ConnectionStats:
+    """Counters collected from aiohttp trace hooks for a single pool."""
+    requests: int = 0
+    connections_created: int = 0
+    connections_reused: int = 0
+    dns_cache_hits: int = 0
+    dns_cache_misses: int = 0
+
+    @property
+    def reuse_rate(self) -> float:
+        """Fraction of connection acquisitions served by a keep-alive connection."""
+        acquired = self.connections_created + self.connections_reused
+        return self.connections_reused / acquired if acquired else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "connections_created": self.connections_created,
+            "connections_reused": self.connections_reused,
+            "dns_cache_hits": self.dns_cache_hits,
+            "dns_cache_misses": self.dns_cache_misses,
+            "reuse_rate": round(self.reuse_rate, 3),
+        }
+
+
+@dataclass
+class ConnectionPool:
+    """
+    Process-wide aiohttp session shared by every tool call in a research run.
+
+    The underlying session is created lazily on first use (so it binds to the
+    running event loop) and must be closed once with `close()` when the run ends.
+
+    Args:
+        limit: Maximum number of open connections across all hosts
+        limit_per_host: Maximum number of open connections to a single host
+        dns_ttl: Seconds to keep resolved addresses in the DNS cache
+        keepalive_timeout: Seconds an idle connection is kept open for reuse
+    """
+    limit: int = 100
+    limit_per_host: int = 8
+    dns_ttl: int = 300
+    keepalive_timeout: float = 30.0
+    stats: ConnectionStats = field(default_factory=ConnectionStats)
+    _session: aiohttp.ClientSession | None = field(default=None, init=False, repr=False)
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                use_dns_cache=True,
+                ttl_dns_cache=self.dns_ttl,
+                keepalive_timeout=self.keepalive_timeout,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                trace_configs=[self._trace_config()],
+            )
+        return self._session
+
+    def _trace_config(self) -> aiohttp.TraceConfig:
+        stats = self.stats
+
+        async def on_request_start(session, ctx: SimpleNamespace, params):
+            stats.requests += 1
+
+        async def on_connection_create_end(session, ctx: SimpleNamespace, params):
+            stats.connections_created += 1
+
+        async def on_connection_reuseconn(session, ctx: SimpleNamespace, params):
+            stats.connections_reused += 1
+
+        async def on_dns_cache_hit(session, ctx: SimpleNamespace, params):
+            stats.dns_cache_hits += 1
+
+        async def on_dns_cache_miss(session, ctx: SimpleNamespace, params):
+            stats.dns_cache_misses += 1
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        trace_config.on_dns_cache_hit.append(on_dns_cache_hit)
+        trace_config.on_dns_cache_miss.append(on_dns_cache_miss)
+        return trace_config
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def __aenter__(self) -> "ConnectionPool":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
@@ -0,0 +1,199 @@
+from dataclasses import dataclass
+from urllib.parse import parse_qsl, unquote_plus, urlencode, urlsplit, urlunsplit
+import html
+import json
+import re
+
+
+FORMATS = ("xml", "compact_xml", "json", "text")
+
+# Query parameters that only identify where a click came from
+TRACKING_PARAMS = ("utm_", "gclid", "fbclid", "msclkid", "mc_cid", "mc_eid", "ref_src", "_hsenc", "_hsmi")
+
+TAG_RE = re.compile(r"<[^>]+>")
+
+
+def strip_tracking(query: str) -> list[tuple[str, str]]:
+    if not query:
+        return []
+    return [
+        (key, value) for key, value in parse_qsl(query, keep_blank_values=True)
+        if not is_tracking(key)
+    ]
+
+
+def is_tracking(key: str) -> bool:
+    return key.lower().startswith(TRACKING_PARAMS)
+
+
+def canonical_url(url: str) -> str:
+    """Key for spotting duplicate results: scheme, www, fragment, tracking params and trailing slash ignored."""
+    parts = urlsplit(url.strip())
+    host = (parts.hostname or "").lower().removeprefix("www.")
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+    query = urlencode(sorted(strip_tracking(parts.query)))
+    return urlunsplit(("", host, parts.path.rstrip("/"), query, "")).lstrip("/")
+
+
+def trim_url(url: str, keep_scheme: bool = True) -> str:
+    """Drop tracking params and the fragment, and optionally an https:// scheme, keeping the URL fetchable."""
+    parts = urlsplit(url.strip())
+    # Filter the raw pairs so the rest of the query keeps its exact encoding
+    query = "&".join(
+        pair for pair in parts.query.split("&")
+        if not is_tracking(unquote_plus(pair.split("=", 1)[0]))
+    ) if parts.query else ""
+    trimmed = urlunsplit((parts.scheme, parts.netloc, parts.path, query, ""))
+    if not keep_scheme and parts.scheme == "https":
+        trimmed = trimmed.removeprefix("https://")
+    return trimmed
+
+
+def dedupe_results(results: list[dict]) -> list[dict]:
+    """Keep the first (highest ranked) result for each canonical URL."""
+    seen = set()
+    unique = []
+    for result in results:
+        key = canonical_url(result.get("url", ""))
+        if key and key in seen:
+            continue
+        seen.add(key)
+        unique.append(result)
+    return unique
+
+
+def plain(text: str) -> str:
+    """Search snippets arrive as HTML fragments; keep just their text."""
+    return html.unescape(TAG_RE.sub("", text))
+
+
+def escape_tags(text: str) -> str:
+    """Escape only what could be read as markup; ampersands and quotes stay as they are."""
+    return text.replace("<", "&lt;")
+
+
+@dataclass
+class ResultEncoder:
+    """
+    Serializes web_search and web_fetch results for the model.
+
+    Formats:
+        xml: Descriptive tags with every field HTML-escaped
+        compact_xml: Short tags, only `<` escaped, snippets reduced to text
+        json: Minified JSON with short keys
+        text: Plain text records separated by blank lines
+
+    Search results are deduplicated by canonical URL in every format. The
+    compact formats also trim tracking parameters and the https:// scheme from
+    URLs; web_fetch accepts URLs without a scheme.
+
+    Args:
+        format: One of FORMATS
+    """
+    format: str = "xml"
+
+    def __post_init__(self):
+        if self.format not in FORMATS:
+            raise ValueError(f"Unknown result format {self.format!r}, expected one of {', '.join(FORMATS)}")
+
+    def links(self, results: list[dict]) -> list[str]:
+        """The fetchable URLs of `results` in the form the model will ask for them."""
+        urls = [result.get("url", "") for result in dedupe_results(results)]
+        return urls if self.format == "xml" else [trim_url(url) for url in urls]
+
+    def search(self, query: str, results: list[dict]) -> str:
+        results = dedupe_results(results)
+        if self.format == "xml":
+            items = "".join(
+                f"""
+<result>
+<title>{html.escape(result.get("title", ""))}</title>
+<url>{html.escape(result.get("url", ""))}</url>
+<description>{html.escape(result.get("description", ""))}</description>
+</result>"""
+                for result in results
+            )
+            return f"""<search_result>
+<query>{html.escape(query)}</query>
+<total_count>{len(results)}</total_count>
+<results>{items}
+</results>
+</search_result>"""
+
+        rows = [
+            (plain(result.get("title", "")), trim_url(result.get("url", ""), keep_scheme=False), plain(result.get("description", "")))
+            for result in results
+        ]
+        if self.format == "compact_xml":
+            items = "".join(
+                f"\n<r><t>{escape_tags(title)}</t><u>{escape_tags(url)}</u><d>{escape_tags(description)}</d></r>"
+                for title, url, description in rows
+            )
+            return f"<search><q>{escape_tags(query)}</q>{items}\n</search>"
+        if self.format == "json":
+            return _json({"q": query, "r": [{"t": title, "u": url, "d": description} for title, url, description in rows]})
+        return "\n\n".join([
+            f"Search: {query} ({len(rows)} results)",
+            *(f"[{i}] {title}\n{url}\n{description}" for i, (title, url, description) in enumerate(rows, start=1)),
+        ])
+
+    def search_error(self, query: str, error: str) -> str:
+        if self.format == "xml":
+            return f"""<search_result>
+<query>{html.escape(query)}</query>
+<error>{html.escape(error)}</error>
+</search_result>"""
+        if self.format == "compact_xml":
+            return f"<search><q>{escape_tags(query)}</q><error>{escape_tags(error)}</error></search>"
+        if self.format == "json":
+            return _json({"q": query, "error": error})
+        return f"Search: {query}\nError: {error}"
+
+    def fetch(self, url: str, status: int, content: str, note: str | None = None) -> str:
+        if self.format == "xml":
+            note_xml = f"\n<note>{note}</note>" if note else ""
+            return f"""<fetch_result>
+<url>{html.escape(url)}</url>
+<status_code>{status}</status_code>{note_xml}
+<content>{html.escape(content)}</content>
+</fetch_result>"""
+
+        url = trim_url(url, keep_scheme=False)
+        if self.format == "compact_xml":
+            note_xml = f"<note>{escape_tags(note)}</note>" if note else ""
+            return f"<page><u>{escape_tags(url)}</u><s>{status}</s>{note_xml}\n{escape_tags(content)}\n</page>"
+        if self.format == "json":
+            record = {"u": url, "s": status, "c": content}
+            if note:
+                record["note"] = note
+            return _json(record)
+        header = f"Page: {url} (HTTP {status})" + (f"\nNote: {note}" if note else "")
+        return f"{header}\n\n{content}"
+
+    def fetch_error(self, url: str, error: str) -> str:
+        if self.format == "xml":
+            return f"""<fetch_result>
+<url>{html.escape(url)}</url>
+<status_code>error</status_code>
+<error>{html.escape(error)}</error>
+</fetch_result>"""
+        if self.format == "compact_xml":
+            return f"<page><u>{escape_tags(url)}</u><error>{escape_tags(error)}</error></page>"
+        if self.format == "json":
+            return _json({"u": url, "error": error})
+        return f"Page: {url}\nError: {error}"
+
+    def is_error(self, output: str) -> bool:
+        """Whether `output` came from search_error or fetch_error."""
+        if self.format == "json":
+            return "error" in json.loads(output)
+        if self.format == "text":
+            lines = output.split("\n", 2)
+            return len(lines) > 1 and lines[1].startswith("Error: ")
+        # Content has `<` escaped, so only the error element can produce this tag
+        return "<error>" in output
+
+
+def _json(value: dict) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
@@ -0,0 +1,151 @@
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+import asyncio
+
+from compression import bm25_scores
+
+
+@dataclass
+class SearchRecord:
+    query: str
+    agent_id: str
+    urls: list[str]
+
+
+@dataclass
+class PageRecord:
+    url: str
+    final_url: str
+    status: int
+    text: str
+    agent_id: str
+    passages: list[str] = field(default_factory=list)
+
+
+@dataclass
+class EvidenceStats:
+    searches: int = 0
+    repeated_searches: int = 0
+    pages: int = 0
+    fetches_saved: int = 0
+
+    def as_dict(self) -> dict:
+        return {
+            "searches": self.searches,
+            "repeated_searches": self.repeated_searches,
+            "pages": self.pages,
+            "fetches_saved": self.fetches_saved,
+        }
+
+
+@dataclass
+class EvidenceStore:
+    """
+    What every subagent in a research run has searched for and read so far.
+
+    Pages fetched by one subagent are served to the others without going back
+    to the network, concurrent fetches of the same URL share one request, and
+    subagents can look up the searches and passages their peers turned up.
+    """
+    stats: EvidenceStats = field(default_factory=EvidenceStats)
+    _searches: dict[str, SearchRecord] = field(default_factory=dict, init=False, repr=False)
+    _pages: dict[str, PageRecord] = field(default_factory=dict, init=False, repr=False)
+    _inflight: dict[str, asyncio.Future] = field(default_factory=dict, init=False, repr=False)
+    _reads: dict[str, list[str]] = field(default_factory=dict, init=False, repr=False)
+    _last_agent_id: int = field(default=0, init=False, repr=False)
+
+    def next_agent_id(self) -> str:
+        self._last_agent_id += 1
+        return f"subagent-{self._last_agent_id}"
+
+    def reserve_agent_id(self, agent_id: str) -> None:
+        """Keep next_agent_id from handing out an ID an earlier attempt of the run already used."""
+        _, _, number = agent_id.rpartition("-")
+        if number.isdigit():
+            self._last_agent_id = max(self._last_agent_id, int(number))
+
+    def record_search(self, key: str, query: str, agent_id: str, urls: list[str]) -> None:
+        if key in self._searches:
+            self.stats.repeated_searches += 1
+            return
+        self.stats.searches += 1
+        self._searches[key] = SearchRecord(query, agent_id, urls)
+
+    def page(self, url: str) -> PageRecord | None:
+        return self._pages.get(url)
+
+    async def fetch_once(self, url: str, fetch: Callable[[], Awaitable[PageRecord]]) -> PageRecord:
+        """Return the page for `url`, fetching it only if no subagent has already done so."""
+        record = self._pages.get(url)
+        if record is not None:
+            self.stats.fetches_saved += 1
+            return record
+
+        inflight = self._inflight.get(url)
+        if inflight is not None:
+            try:
+                record = await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                # A cancelled speculative fetch should not cancel the callers waiting on it
+                if not inflight.cancelled():
+                    raise
+                return await self.fetch_once(url, fetch)
+            self.stats.fetches_saved += 1
+            return record
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[url] = future
+        try:
+            record = await fetch()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so an unawaited failure does not log a warning
+            future.exception()
+            raise
+        else:
+            self.stats.pages += 1
+            self._pages[url] = record
+            self._pages.setdefault(record.final_url, record)
+            future.set_result(record)
+            return record
+        finally:
+            self._inflight.pop(url, None)
+
+    def record_read(self, agent_id: str, url: str) -> None:
+        """Note that `agent_id` was handed the page at `url`, however it was fetched."""
+        reads = self._reads.setdefault(agent_id, [])
+        if url not in reads:
+            reads.append(url)
+
+    def urls_read(self, agent_id: str) -> list[str]:
+        """Pages `agent_id` read through web_fetch, in the order it read them."""
+        return list(self._reads.get(agent_id, []))
+
+    def record_passages(self, url: str, passages: list[str]) -> None:
+        """Remember the excerpt of a page that was handed to a subagent."""
+        record = self._pages.get(url)
+        if record is not None:
+            record.passages.extend(p for p in passages if p not in record.passages)
+
+    def lookup(self, topic: str, agent_id: str, limit: int = 5) -> tuple[list[SearchRecord], list[tuple[PageRecord, str]]]:
+        """
+        Find what other subagents have already covered.
+
+        Returns their searches and the passages they read, best matches for
+        `topic` first.
+        """
+        searches = [record for record in self._searches.values() if record.agent_id != agent_id]
+        candidates = [
+            (record, passage)
+            for record in {id(r): r for r in self._pages.values()}.values()
+            if record.agent_id != agent_id
+            for passage in record.passages
+        ]
+        if not candidates:
+            return searches, []
+        scores = bm25_scores(topic, [passage for _, passage in candidates])
+        ranked = sorted(range(len(candidates)), key=lambda i: -scores[i])
+        return searches, [candidates[i] for i in ranked[:limit] if scores[i] > 0]
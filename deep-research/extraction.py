@@ -0,0 +1,299 @@
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+from typing import Iterable
+import asyncio
+import codecs
+import multiprocessing
+import os
+
+import aiohttp
+from bs4 import BeautifulSoup
+
+from metrics import RunMetrics
+
+
+SKIPPED_TAGS = frozenset(['script', 'style', 'nav', 'header', 'footer', 'aside', 'menu'])
+
+TEXT_CONTENT_TYPES = frozenset(['text/html', 'application/xhtml+xml', 'text/plain'])
+
+# Leading bytes of formats that are served with missing or wrong content types
+BINARY_SIGNATURES = {
+    b'%PDF-': 'PDF',
+    b'\x89PNG': 'PNG',
+    b'GIF8': 'GIF',
+    b'\xff\xd8\xff': 'JPEG',
+    b'PK\x03\x04': 'ZIP',
+    b'\x1f\x8b': 'gzip',
+    b'RIFF': 'RIFF media',
+    b'OggS': 'Ogg',
+}
+
+
+class UnsupportedContentType(Exception):
+    """Raised when a response is not a document we can extract text from."""
+
+
+@dataclass
+class ExtractionSettings:
+    """
+    Settings for turning fetched pages into text.
+
+    Args:
+        streaming: Parse the body incrementally instead of building a full soup
+        max_text_chars: Stop reading once this much text has been extracted
+        chunk_size: Bytes read from the response per chunk
+        executor: Where parsing runs - "process", "thread" or "inline" on the event loop
+        workers: Number of executor workers
+        max_pending: Documents allowed in flight to the executor before callers wait
+        timeout: Seconds allowed to parse a single document
+        max_body_bytes: Bytes of a response body read at most; the rest is not downloaded
+
+    Only inline streaming stops downloading once `max_text_chars` of text has
+    been extracted. The pooled executors need the body up front, so they read
+    up to `max_body_bytes` before parsing and apply the text budget in the worker.
+    """
+    streaming: bool = True
+    max_text_chars: int = 200_000
+    chunk_size: int = 64 * 1024
+    executor: str = "process"
+    workers: int = field(default_factory=lambda: min(4, os.cpu_count() or 1))
+    max_pending: int = 16
+    timeout: float = 20.0
+    max_body_bytes: int = 8 * 1024 * 1024
+
+
+def extract_text_content(html_content: str) -> str:
+    """Extract clean readable text from HTML content using BeautifulSoup."""
+    soup = BeautifulSoup(html_content, 'html.parser')
+
+    # Remove unwanted elements
+    for element in soup.find_all(list(SKIPPED_TAGS)):
+        element.decompose()
+
+    # Extract clean text with proper spacing
+    text = soup.get_text(separator=' ', strip=True)
+
+    return text
+
+
+class StreamingTextExtractor(HTMLParser):
+    """
+    Incremental HTML-to-text parser.
+
+    Text inside SKIPPED_TAGS is dropped as it is parsed, and `done` flips once
+    `max_chars` of text has been collected so callers can stop reading.
+    """
+
+    def __init__(self, max_chars: int):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.parts: list[str] = []
+        self.pending: list[str] = []
+        self.length = 0
+        self.skip_depth = 0
+
+    @property
+    def done(self) -> bool:
+        return self.length >= self.max_chars
+
+    def handle_starttag(self, tag, attrs):
+        self.flush()
+        if tag in SKIPPED_TAGS:
+            self.skip_depth += 1
+
+    def handle_endtag(self, tag):
+        self.flush()
+        if tag in SKIPPED_TAGS and self.skip_depth:
+            self.skip_depth -= 1
+
+    def handle_comment(self, data):
+        self.flush()
+
+    def handle_data(self, data):
+        # Text nodes can arrive split across chunk boundaries, so buffer until the next tag
+        if not self.skip_depth and not self.done:
+            self.pending.append(data)
+
+    def flush(self):
+        text = ''.join(self.pending).strip()
+        self.pending.clear()
+        if text and not self.done:
+            # Account for the joining space so the budget matches the output
+            self.parts.append(text)
+            self.length += len(text) + 1
+
+    def close(self):
+        super().close()
+        self.flush()
+
+    def text(self) -> str:
+        self.flush()
+        return ' '.join(self.parts)[:self.max_chars]
+
+
+def check_content_type(content_type: str) -> None:
+    """Reject responses that are clearly not text documents before reading the body."""
+    mime_type = content_type.split(';')[0].strip().lower()
+    if mime_type and mime_type not in TEXT_CONTENT_TYPES:
+        raise UnsupportedContentType(f"Unsupported content type: {mime_type}")
+
+
+def sniff_binary(chunk: bytes) -> None:
+    """Reject a body whose first bytes show it is not text, whatever its Content-Type said."""
+    for signature, name in BINARY_SIGNATURES.items():
+        if chunk.startswith(signature):
+            raise UnsupportedContentType(f"Unsupported content: {name} data")
+    # UTF-16 text is full of NULs but starts with a byte order mark
+    if b'\x00' in chunk[:1024] and not chunk.startswith((b'\xff\xfe', b'\xfe\xff')):
+        raise UnsupportedContentType("Unsupported content: binary data")
+
+
+def incremental_decoder(encoding: str | None) -> codecs.IncrementalDecoder:
+    """Return a decoder for the declared charset, falling back to UTF-8 for unknown ones."""
+    try:
+        return codecs.getincrementaldecoder(encoding or 'utf-8')(errors='replace')
+    except LookupError:
+        return codecs.getincrementaldecoder('utf-8')(errors='replace')
+
+
+def extract_text_from_bytes(body: bytes, encoding: str | None = None) -> str:
+    """Decode a full body and extract it with BeautifulSoup."""
+    return extract_text_content(incremental_decoder(encoding).decode(body, final=True))
+
+
+def extract_text_from_chunks(chunks: Iterable[bytes], encoding: str | None = None, max_chars: int = 200_000) -> str:
+    """Extract text from an iterable of raw body chunks, stopping at the text budget."""
+    decoder = incremental_decoder(encoding)
+    parser = StreamingTextExtractor(max_chars)
+    for chunk in chunks:
+        parser.feed(decoder.decode(chunk))
+        if parser.done:
+            break
+    else:
+        parser.feed(decoder.decode(b'', final=True))
+        parser.close()
+    return parser.text()
+
+
+async def stream_extract(response: aiohttp.ClientResponse, settings: ExtractionSettings) -> str:
+    """Read a response body chunk by chunk, extracting text until the budget is reached."""
+    check_content_type(response.headers.get('Content-Type', ''))
+    decoder = incremental_decoder(response.charset)
+    parser = StreamingTextExtractor(settings.max_text_chars)
+    total = 0
+    async for chunk in response.content.iter_chunked(settings.chunk_size):
+        if total == 0:
+            sniff_binary(chunk)
+        total += len(chunk)
+        parser.feed(decoder.decode(chunk))
+        if parser.done or total >= settings.max_body_bytes:
+            # Stop downloading; the connection is released when the response closes
+            break
+    else:
+        parser.feed(decoder.decode(b'', final=True))
+        parser.close()
+    return parser.text()
+
+
+async def read_body_chunks(response: aiohttp.ClientResponse, settings: ExtractionSettings) -> list[bytes]:
+    """Buffer up to `max_body_bytes` of the response body as raw chunks."""
+    chunks = []
+    total = 0
+    async for chunk in response.content.iter_chunked(settings.chunk_size):
+        if not chunks:
+            sniff_binary(chunk)
+        chunks.append(chunk)
+        total += len(chunk)
+        if total >= settings.max_body_bytes:
+            break
+    return chunks
+
+
+@dataclass
+class TextExtractor:
+    """
+    Runs text extraction off the event loop.
+
+    Parsing is CPU bound, so with many concurrent fetches it would otherwise
+    stall every other request and model call. Documents are handed to a process
+    or thread pool; a semaphore bounds how many are queued for it so a burst of
+    fetches waits here instead of piling up buffered bodies.
+
+    A document that runs past `timeout` is abandoned by its caller but cannot be
+    stopped in the worker, so it keeps its slot until the worker finishes it.
+    """
+    settings: ExtractionSettings = field(default_factory=ExtractionSettings)
+    _executor: Executor | None = field(default=None, init=False, repr=False)
+    _slots: asyncio.Semaphore | None = field(default=None, init=False, repr=False)
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            if self.settings.executor == "process":
+                # spawn avoids forking a process that already runs exporter threads
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.settings.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.settings.workers,
+                    thread_name_prefix="extract",
+                )
+        return self._executor
+
+    async def extract_response(
+        self,
+        response: aiohttp.ClientResponse,
+        metrics: RunMetrics | None = None,
+        agent_id: str = ""
+    ) -> str:
+        """
+        Extract text from a response according to the configured mode.
+
+        With `metrics`, body download time is recorded as fetch_network and
+        extraction as parse. Inline streaming interleaves the two, so all of it
+        counts as parse.
+        """
+        metrics = metrics or RunMetrics(record_events=False)
+        settings = self.settings
+        check_content_type(response.headers.get('Content-Type', ''))
+
+        if settings.executor == "inline":
+            if settings.streaming:
+                with metrics.timed(agent_id, "parse"):
+                    return await stream_extract(response, settings)
+            with metrics.timed(agent_id, "fetch_network"):
+                chunks = await read_body_chunks(response, settings)
+            with metrics.timed(agent_id, "parse"):
+                return extract_text_from_bytes(b''.join(chunks), response.charset)
+
+        with metrics.timed(agent_id, "fetch_network"):
+            chunks = await read_body_chunks(response, settings)
+        with metrics.timed(agent_id, "parse"):
+            if settings.streaming:
+                return await self.run(extract_text_from_chunks, chunks, response.charset, settings.max_text_chars)
+            return await self.run(extract_text_from_bytes, b''.join(chunks), response.charset)
+
+    async def run(self, fn, *args) -> str:
+        """Run an extraction function in the executor, bounded by `max_pending` and `timeout`."""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.settings.max_pending)
+        slots = self._slots
+        await slots.acquire()
+        future = asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+        def release(done: asyncio.Future) -> None:
+            # Release on completion, not on timeout, so max_pending bounds the work the pool really has
+            slots.release()
+            if not done.cancelled():
+                done.exception()
+
+        future.add_done_callback(release)
+        return await asyncio.wait_for(asyncio.shield(future), timeout=self.settings.timeout)
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,194 @@
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, TypeVar
+import asyncio
+import random
+import time
+
+import aiohttp
+
+T = TypeVar("T")
+
+# Statuses worth another attempt; anything else is returned to the caller as is
+RETRY_STATUSES = frozenset([408, 425, 429, 500, 502, 503, 504])
+
+
+class RetryableStatus(Exception):
+    def __init__(self, status: int, retry_after: float | None = None):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+        self.retry_after = retry_after
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Exponential backoff with full jitter, so retries from many subagents do not line up."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def retry_after(headers, default: float | None) -> float | None:
+    """Seconds to wait before retrying, from a Retry-After header if the server sent one."""
+    value = headers.get("Retry-After", "")
+    return float(value) if value.isdigit() else default
+
+
+@dataclass
+class LatencyTracker:
+    """Recent request latencies, for picking a hedging delay."""
+    window: int = 200
+    _samples: deque = field(default_factory=deque, init=False, repr=False)
+
+    def add(self, seconds: float) -> None:
+        self._samples.append(seconds)
+        if len(self._samples) > self.window:
+            self._samples.popleft()
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def quantile(self, q: float) -> float:
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+@dataclass
+class FetchStats:
+    requests: int = 0
+    retries: int = 0
+    hedged: int = 0
+    hedge_wins: int = 0
+    failures: int = 0
+
+    def as_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "failures": self.failures,
+        }
+
+
+@dataclass
+class Fetcher:
+    """
+    GET with bounded tail latency for web_fetch.
+
+    Each request has its own connect and per-read timeouts and follows at most
+    `max_redirects` redirects, and every attempt and hedge shares one deadline
+    set by the caller's timeout. Network errors, connect and read timeouts and
+    retryable statuses are retried with jittered exponential backoff while the
+    deadline allows; errors raised by the response handler are not. With `hedge` enabled, a request whose response
+    headers have not arrived within the `hedge_quantile` latency of recent
+    requests gets a second copy sent alongside it, and whichever finishes
+    first wins. The response handler must be safe to run twice for that reason.
+
+    Args:
+        connect_timeout: Seconds allowed to open a connection
+        read_timeout: Seconds allowed between reads of the response
+        max_redirects: Redirects followed before giving up
+        attempts: Tries per request, including the first
+        backoff_base: Seconds of the first backoff step
+        backoff_cap: Longest backoff between attempts
+        hedge: Send a hedged second request for slow responses
+        hedge_quantile: Time-to-headers quantile after which a request is hedged
+        hedge_min_samples: Latencies observed before hedging starts
+    """
+    connect_timeout: float = 5.0
+    read_timeout: float = 15.0
+    max_redirects: int = 5
+    attempts: int = 3
+    backoff_base: float = 0.5
+    backoff_cap: float = 8.0
+    hedge: bool = False
+    hedge_quantile: float = 0.95
+    hedge_min_samples: int = 20
+    stats: FetchStats = field(default_factory=FetchStats)
+    latency: LatencyTracker = field(default_factory=LatencyTracker)
+
+    def timeout(self, total: float) -> aiohttp.ClientTimeout:
+        return aiohttp.ClientTimeout(total=total, sock_connect=self.connect_timeout, sock_read=self.read_timeout)
+
+    async def get(
+        self,
+        session: aiohttp.ClientSession,
+        url: str,
+        handle: Callable[[aiohttp.ClientResponse], Awaitable[T]],
+        headers: dict | None = None,
+        timeout: float = 30.0
+    ) -> T:
+        """
+        Request `url` and return what `handle` makes of the response.
+
+        `timeout` bounds the whole call, retries and hedges included. Raises the
+        last error once every attempt has failed or the deadline leaves no room
+        for another; a bad URL, too many redirects and anything `handle` raises
+        other than a network error while reading the body are raised straight away.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        for attempt in range(self.attempts):
+            delay = backoff_delay(attempt, self.backoff_base, self.backoff_cap)
+            try:
+                return await self._hedged(session, url, handle, headers, deadline)
+            except RetryableStatus as e:
+                error = e
+                if e.retry_after is not None:
+                    delay = min(self.backoff_cap, e.retry_after)
+            except aiohttp.ClientError as e:
+                # Connect and read timeouts are ClientErrors; a bare TimeoutError is the deadline or the handler's own
+                if isinstance(e, (aiohttp.InvalidURL, aiohttp.TooManyRedirects)):
+                    self.stats.failures += 1
+                    raise
+                error = e
+            except Exception:
+                self.stats.failures += 1
+                raise
+            if attempt + 1 == self.attempts or loop.time() + delay >= deadline:
+                break
+            self.stats.retries += 1
+            await asyncio.sleep(delay)
+        self.stats.failures += 1
+        raise error
+
+    async def _hedged(self, session, url, handle, headers, deadline):
+        if not self.hedge or len(self.latency) < self.hedge_min_samples:
+            return await self._once(session, url, handle, headers, deadline)
+
+        responded = asyncio.Event()
+        first = asyncio.create_task(self._once(session, url, handle, headers, deadline, responded))
+        waiter = asyncio.create_task(responded.wait())
+        # Slow bodies are bounded by the read timeout; hedging is for servers that have not answered yet
+        await asyncio.wait([first, waiter], timeout=self.latency.quantile(self.hedge_quantile), return_when=asyncio.FIRST_COMPLETED)
+        waiter.cancel()
+        if first.done() or responded.is_set():
+            return await first
+
+        self.stats.hedged += 1
+        second = asyncio.create_task(self._once(session, url, handle, headers, deadline))
+        pending = {first, second}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is second:
+                            self.stats.hedge_wins += 1
+                        return task.result()
+            # Both copies failed; let the retry loop see the first error
+            return first.result()
+        finally:
+            for task in (first, second):
+                task.cancel()
+            await asyncio.gather(first, second, return_exceptions=True)
+
+    async def _once(self, session, url, handle, headers, deadline: float, responded: asyncio.Event | None = None):
+        self.stats.requests += 1
+        start = time.perf_counter()
+        timeout = self.timeout(deadline - asyncio.get_running_loop().time())
+        async with session.get(url, headers=headers, timeout=timeout, max_redirects=self.max_redirects) as response:
+            self.latency.add(time.perf_counter() - start)
+            if responded is not None:
+                responded.set()
+            if response.status in RETRY_STATUSES:
+                raise RetryableStatus(response.status, retry_after(response.headers, None))
+            return await handle(response)
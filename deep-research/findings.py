@@ -0,0 +1,174 @@
+from dataclasses import asdict, dataclass, field
+from typing import Literal
+from urllib.parse import urlsplit
+import html
+import json
+import re
+
+from pydantic import BaseModel, Field
+
+
+MAX_CLAIMS = 12
+MAX_CLAIM_CHARS = 300
+MAX_CLAIM_SOURCES = 3
+MAX_SOURCES = 10
+MAX_SUMMARY_CHARS = 600
+
+Confidence = Literal["high", "medium", "low"]
+
+URL_RE = re.compile(r"https?://[^\s<>\"'\])]+")
+BULLET_RE = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s+")
+SENTENCE_RE = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9])")
+
+
+class ReportedClaim(BaseModel):
+    statement: str = Field(description="One specific, self-contained finding (a fact, number, date or conclusion)")
+    sources: list[str] = Field(default_factory=list, description="URLs of the pages that support this claim")
+    confidence: Confidence = Field(default="medium", description="How well the sources support the claim")
+
+
+class SubagentReport(BaseModel):
+    """Final report for the lead researcher."""
+    summary: str = Field(description="Two or three sentences answering the task")
+    claims: list[ReportedClaim] = Field(description="The key findings, most important first")
+    confidence: Confidence = Field(description="Overall confidence in the findings")
+    caveats: list[str] = Field(default_factory=list, description="Conflicts, speculation or gaps the lead should know about")
+
+
+@dataclass
+class Claim:
+    statement: str
+    sources: list[str] = field(default_factory=list)
+    confidence: Confidence = "medium"
+
+
+@dataclass
+class Findings:
+    """
+    A subagent's result in a bounded shape for the lead agent's context.
+
+    At most MAX_CLAIMS claims of MAX_CLAIM_CHARS each are kept, however long
+    the subagent's report was.
+    """
+    agent_id: str
+    summary: str
+    claims: list[Claim]
+    sources: list[str]
+    confidence: Confidence
+    caveats: list[str] = field(default_factory=list)
+    claims_dropped: int = 0
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self))
+
+    @classmethod
+    def from_json(cls, data: str) -> "Findings":
+        record = json.loads(data)
+        record["claims"] = [Claim(**claim) for claim in record["claims"]]
+        return cls(**record)
+
+    def to_xml(self, compact: bool = False) -> str:
+        """Render for the lead; `compact` keeps only the summary and claim statements."""
+        if compact:
+            claims = "".join(f"\n<claim>{html.escape(claim.statement)}</claim>" for claim in self.claims[:5])
+            return f"""<findings id="{self.agent_id}" confidence="{self.confidence}" compacted="true">
+<summary>{html.escape(self.summary)}</summary>{claims}
+</findings>"""
+
+        claims = "".join(
+            f'\n<claim confidence="{claim.confidence}">{html.escape(claim.statement)}'
+            + "".join(f"\n<source>{html.escape(url)}</source>" for url in claim.sources)
+            + "\n</claim>"
+            for claim in self.claims
+        )
+        caveats = "".join(f"\n<caveat>{html.escape(caveat)}</caveat>" for caveat in self.caveats)
+        sources = "".join(f"\n<source>{html.escape(url)}</source>" for url in self.sources)
+        dropped = f"\n<note>{self.claims_dropped} lower-priority claims omitted</note>" if self.claims_dropped else ""
+        return f"""<findings id="{self.agent_id}" confidence="{self.confidence}">
+<summary>{html.escape(self.summary)}</summary>
+<claims>{claims}
+</claims>{caveats}
+<sources>{sources}
+</sources>{dropped}
+</findings>"""
+
+
+def clip(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit - 1].rstrip() + "…"
+
+
+def claims_from_text(text: str) -> list[Claim]:
+    """Claims from a free-text report: its bullet points, or its sentences when it has none."""
+    lines = [line for line in text.splitlines() if line.strip()]
+    bullets = [BULLET_RE.sub("", line) for line in lines if BULLET_RE.match(line)]
+    if bullets:
+        candidates = bullets
+    else:
+        candidates = [sentence for line in lines if not line.lstrip().startswith("#") for sentence in SENTENCE_RE.split(line)]
+    claims = []
+    for candidate in candidates:
+        statement = candidate.replace("**", "").strip()
+        if len(statement) < 20:
+            continue
+        claims.append(Claim(statement, urls_in(statement)))
+    return claims
+
+
+def leading_prose(text: str) -> str:
+    """The first paragraph of a report that is neither a heading nor a list."""
+    paragraph = []
+    for line in text.splitlines():
+        prose = line.strip() and not line.lstrip().startswith("#") and not BULLET_RE.match(line)
+        if prose:
+            paragraph.append(line.strip())
+        elif paragraph:
+            break
+    return " ".join(paragraph)
+
+
+def urls_in(text: str) -> list[str]:
+    return list(dict.fromkeys(url.rstrip(".,;:") for url in URL_RE.findall(text)))
+
+
+def estimate_confidence(sources: list[str]) -> Confidence:
+    """Without a stated confidence, judge by how many independent sites back the findings."""
+    domains = {urlsplit(url).hostname for url in sources}
+    if len(domains) >= 3:
+        return "high"
+    return "medium" if domains else "low"
+
+
+def normalize_findings(agent_id: str, output: SubagentReport | str, read_urls: list[str]) -> Findings:
+    """
+    Turn a subagent's output into bounded Findings.
+
+    `read_urls` are the pages the subagent fetched; they fill in the source
+    list when the report cites fewer than MAX_SOURCES itself.
+    """
+    if isinstance(output, SubagentReport):
+        summary = output.summary
+        claims = [Claim(claim.statement, claim.sources, claim.confidence) for claim in output.claims]
+        confidence = output.confidence
+        caveats = output.caveats
+    else:
+        claims = claims_from_text(output)
+        summary = leading_prose(output) or output
+        confidence = estimate_confidence(urls_in(output) or read_urls)
+        caveats = []
+
+    kept = [
+        Claim(clip(claim.statement, MAX_CLAIM_CHARS), claim.sources[:MAX_CLAIM_SOURCES], claim.confidence)
+        for claim in claims[:MAX_CLAIMS]
+    ]
+    cited = [url for claim in claims for url in claim.sources]
+    sources = list(dict.fromkeys(cited + read_urls))[:MAX_SOURCES]
+    return Findings(
+        agent_id=agent_id,
+        summary=clip(summary, MAX_SUMMARY_CHARS),
+        claims=kept,
+        sources=sources,
+        confidence=confidence,
+        caveats=[clip(caveat, MAX_CLAIM_CHARS) for caveat in caveats[:3]],
+        claims_dropped=max(0, len(claims) - MAX_CLAIMS),
+    )
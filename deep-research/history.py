@@ -0,0 +1,82 @@
+from dataclasses import dataclass, field, replace
+
+from pydantic_ai.messages import ModelMessage, ModelRequest, ToolCallPart, ToolReturnPart
+
+from compression import estimate_tokens
+
+
+def message_tokens(message: ModelMessage) -> int:
+    """Rough token count of everything a message puts in the prompt."""
+    total = 0
+    for part in message.parts:
+        if isinstance(part, ToolCallPart):
+            total += estimate_tokens(part.args_as_json_str())
+        else:
+            content = getattr(part, "content", "")
+            total += estimate_tokens(content if isinstance(content, str) else str(content))
+    return total
+
+
+@dataclass
+class HistoryCompactor:
+    """
+    Keeps the lead agent's prompt bounded as subagent results pile up.
+
+    Runs as a history processor before every lead model request and reports
+    the estimated context size of each turn. With `enabled` set and the
+    history over `max_tokens`, the oldest tool results are swapped for their
+    compact form (registered with `remember`, or a clipped prefix otherwise)
+    until the prompt fits; the last `keep_recent` messages are never touched.
+    Only the copy sent to the model changes, so checkpoints keep the full
+    history.
+
+    Args:
+        enabled: Compact the history once it exceeds `max_tokens`
+        max_tokens: Estimated prompt size that triggers compaction
+        keep_recent: Trailing messages always sent in full
+        fallback_chars: Characters kept of a result with no registered compact form
+    """
+    enabled: bool = False
+    max_tokens: int = 24_000
+    keep_recent: int = 4
+    fallback_chars: int = 600
+    _compact: dict[str, str] = field(default_factory=dict, init=False, repr=False)
+
+    def remember(self, tool_call_id: str | None, compact: str) -> None:
+        """Register the short form of a tool result for use when compacting."""
+        if tool_call_id is not None:
+            self._compact[tool_call_id] = compact
+
+    def process(self, messages: list[ModelMessage]) -> tuple[list[ModelMessage], dict]:
+        """Return the history to send and the turn's context size before and after compaction."""
+        sizes = [message_tokens(message) for message in messages]
+        before = sum(sizes)
+        total = before
+        compacted = 0
+        if self.enabled and total > self.max_tokens:
+            messages = list(messages)
+            for i in range(max(0, len(messages) - self.keep_recent)):
+                if total <= self.max_tokens:
+                    break
+                message = messages[i]
+                if not isinstance(message, ModelRequest):
+                    continue
+                parts = [self._compact_part(part) for part in message.parts]
+                if any(new is not old for new, old in zip(parts, message.parts)):
+                    messages[i] = replace(message, parts=parts)
+                    size = message_tokens(messages[i])
+                    total += size - sizes[i]
+                    compacted += 1
+        return messages, {"messages": len(messages), "tokens": before, "sent_tokens": total, "compacted": compacted}
+
+    def _compact_part(self, part):
+        if not isinstance(part, ToolReturnPart) or not isinstance(part.content, str):
+            return part
+        compact = self._compact.get(part.tool_call_id)
+        if compact is None:
+            if len(part.content) <= self.fallback_chars:
+                return part
+            compact = part.content[:self.fallback_chars] + f"\n[compacted: {len(part.content) - self.fallback_chars} characters omitted]"
+        if len(compact) >= len(part.content):
+            return part
+        return replace(part, content=compact)
@@ -0,0 +1,187 @@
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Iterator
+import sys
+import time
+
+from pydantic_ai.usage import Usage
+
+
+LEAD_AGENT_ID = "lead"
+
+# Time categories recorded by the pipeline
+CATEGORIES = ("model", "queue", "search", "fetch_network", "parse")
+
+
+@dataclass
+class Span:
+    agent_id: str
+    start: float
+    end: float | None = None
+
+    @property
+    def duration(self) -> float:
+        return (self.end or time.perf_counter()) - self.start
+
+
+@dataclass
+class RunMetrics:
+    """
+    Where one research run spent its wall time and tokens.
+
+    Time is accumulated per agent and category (model calls, scheduler queueing,
+    search, fetch network, HTML parsing), tokens per agent, and cache outcomes as
+    counters. Structured events replace ad-hoc prints; they are kept in memory
+    when `record_events` is set and written to stderr when `echo` is set.
+
+    Args:
+        record_events: Keep emitted events for export
+        echo: Also write each event to stderr as it happens
+    """
+    record_events: bool = True
+    echo: bool = False
+    started: float = field(default_factory=time.perf_counter)
+    finished: float | None = None
+    timings: defaultdict[str, Counter] = field(default_factory=lambda: defaultdict(Counter))
+    counts: Counter = field(default_factory=Counter)
+    tokens: defaultdict[str, Usage] = field(default_factory=lambda: defaultdict(Usage))
+    spans: dict[str, Span] = field(default_factory=dict)
+    context: list[dict] = field(default_factory=list)
+    events: list[dict] = field(default_factory=list)
+
+    def add_time(self, agent_id: str, category: str, seconds: float) -> None:
+        self.timings[agent_id][category] += seconds
+
+    @contextmanager
+    def timed(self, agent_id: str, category: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[agent_id][category] += time.perf_counter() - start
+
+    def count(self, name: str, n: int = 1) -> None:
+        self.counts[name] += n
+
+    def add_usage(self, agent_id: str, usage: Usage) -> None:
+        self.tokens[agent_id].incr(usage)
+
+    def emit(self, agent_id: str, name: str, **fields) -> None:
+        """Record a structured event; a no-op when both recording and echo are off."""
+        if not (self.record_events or self.echo):
+            return
+        event = {"t": round(time.perf_counter() - self.started, 3), "agent": agent_id, "event": name, **fields}
+        if self.record_events:
+            self.events.append(event)
+        if self.echo:
+            details = " ".join(f"{key}={value}" for key, value in fields.items())
+            print(f"[{event['t']:8.3f}s] {agent_id} {name} {details}", file=sys.stderr)
+
+    def record_context(self, agent_id: str, **sizes) -> None:
+        """Record the prompt size of one model turn."""
+        self.context.append({"agent": agent_id, "turn": sum(turn["agent"] == agent_id for turn in self.context) + 1, **sizes})
+
+    def subagent_started(self, agent_id: str) -> None:
+        self.spans[agent_id] = Span(agent_id, time.perf_counter())
+        self.emit(agent_id, "subagent_started")
+
+    def subagent_finished(self, agent_id: str) -> None:
+        span = self.spans.get(agent_id)
+        if span is not None:
+            span.end = time.perf_counter()
+            self.emit(agent_id, "subagent_finished", seconds=round(span.duration, 3))
+
+    def finish(self) -> None:
+        self.finished = time.perf_counter()
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.perf_counter()) - self.started
+
+    def critical_path(self) -> list[dict]:
+        """
+        The chain of work that determined the run's wall time.
+
+        Subagents whose runs overlap are grouped into one fan-out wave; the
+        subagent that finished last in each wave is on the critical path. Time
+        outside every wave belongs to the lead agent.
+        """
+        spans = sorted((span for span in self.spans.values() if span.end is not None), key=lambda span: span.start)
+        waves: list[list[Span]] = []
+        for span in spans:
+            if waves and span.start < max(s.end for s in waves[-1]):
+                waves[-1].append(span)
+            else:
+                waves.append([span])
+
+        path = []
+        covered = 0.0
+        for wave in waves:
+            slowest = max(wave, key=lambda span: span.end)
+            wave_time = slowest.end - min(span.start for span in wave)
+            covered += wave_time
+            path.append({
+                "agent": slowest.agent_id,
+                "wave_size": len(wave),
+                "seconds": round(wave_time, 3),
+                **{category: round(self.timings[slowest.agent_id][category], 3) for category in CATEGORIES},
+            })
+        path.insert(0, {"agent": LEAD_AGENT_ID, "seconds": round(self.elapsed - covered, 3)})
+        return path
+
+    def cache_hit_rates(self) -> dict:
+        rates = {}
+        for cache in ("search_cache", "page_cache", "evidence"):
+            hits = self.counts[f"{cache}.hit"]
+            total = hits + self.counts[f"{cache}.miss"]
+            rates[cache] = round(hits / total, 3) if total else None
+        return rates
+
+    def as_dict(self) -> dict:
+        totals = Counter()
+        for categories in self.timings.values():
+            totals.update(categories)
+        return {
+            "elapsed_seconds": round(self.elapsed, 3),
+            "time_seconds": {category: round(totals[category], 3) for category in CATEGORIES},
+            "time_by_agent": {
+                agent: {category: round(seconds, 3) for category, seconds in categories.items()}
+                for agent, categories in self.timings.items()
+            },
+            "tokens": {
+                agent: {
+                    "requests": usage.requests,
+                    "request_tokens": usage.request_tokens,
+                    "response_tokens": usage.response_tokens,
+                    "total_tokens": usage.total_tokens,
+                }
+                for agent, usage in self.tokens.items()
+            },
+            "counts": dict(self.counts),
+            "cache_hit_rates": self.cache_hit_rates(),
+            "critical_path": self.critical_path(),
+            "context": self.context,
+            "events": self.events,
+        }
+
+    def summary_table(self) -> str:
+        """Plain-text table of time and tokens per agent."""
+        lines = [f"{'agent':<14}" + "".join(f"{category:>14}" for category in CATEGORIES) + f"{'tokens':>10}"]
+        agents = sorted(set(self.timings) | set(self.tokens), key=lambda agent: (agent != LEAD_AGENT_ID, agent))
+        for agent in agents:
+            lines.append(
+                f"{agent:<14}"
+                + "".join(f"{self.timings[agent][category]:>13.2f}s" for category in CATEGORIES)
+                + f"{self.tokens[agent].total_tokens or 0:>10}"
+            )
+        lines.append(f"elapsed {self.elapsed:.2f}s, cache hit rates {self.cache_hit_rates()}")
+        path = " -> ".join(f"{step['agent']} ({step['seconds']:.2f}s)" for step in self.critical_path())
+        lines.append(f"critical path: {path}")
+        if self.context:
+            sizes = ", ".join(
+                f"{turn['tokens']}" + (f"->{turn['sent_tokens']}" if turn["sent_tokens"] != turn["tokens"] else "")
+                for turn in self.context
+            )
+            lines.append(f"lead context tokens per turn: {sizes}")
+        return "\n".join(lines)
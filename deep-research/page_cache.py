@@ -0,0 +1,231 @@
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
+from email.utils import parsedate_to_datetime
+from typing import Mapping
+import sqlite3
+import time
+
+
+def parse_cache_control(value: str | None) -> dict[str, str | None]:
+    """Parse a Cache-Control header into a directive -> argument mapping."""
+    directives: dict[str, str | None] = {}
+    for part in (value or "").split(","):
+        name, _, arg = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = arg.strip('"') or None
+    return directives
+
+
+def freshness_lifetime(headers: Mapping[str, str]) -> float | None:
+    """
+    Return how many seconds a response may be served without revalidation.
+
+    Returns None if the response must not be stored at all. This is a private
+    cache (one process, one user), so `private` responses are stored and
+    `s-maxage`, which only applies to shared caches, is ignored.
+    """
+    directives = parse_cache_control(headers.get("Cache-Control"))
+    if "no-store" in directives:
+        return None
+    if "no-cache" in directives:
+        return 0.0
+    if (directives.get("max-age") or "").isdigit():
+        return float(directives["max-age"])
+    if "Expires" in headers:
+        try:
+            return max(0.0, parsedate_to_datetime(headers["Expires"]).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return 0.0
+    return 0.0
+
+
+@dataclass
+class PageCacheEntry:
+    final_url: str
+    status: int
+    text: str
+    etag: str | None = None
+    last_modified: str | None = None
+    expires_at: float = 0.0
+
+    @property
+    def size(self) -> int:
+        return len(self.text)
+
+    def is_fresh(self) -> bool:
+        return self.expires_at > time.time()
+
+    def validators(self) -> dict[str, str]:
+        """Headers for a conditional GET that revalidates this entry."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+@dataclass
+class PageCacheStats:
+    hits: int = 0
+    revalidated: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    def as_dict(self) -> dict:
+        return {
+            "hits": self.hits,
+            "revalidated": self.revalidated,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+@dataclass
+class PageCache:
+    """
+    Size-bounded cache of extracted page text keyed by final URL.
+
+    Entries follow HTTP caching semantics: a fresh entry (Cache-Control max-age
+    or Expires) is served without touching the network, and a stale entry with
+    an ETag or Last-Modified validator is revalidated with a conditional GET.
+    Requested URLs are aliased to the final URL after redirects.
+
+    Args:
+        max_bytes: Upper bound on cached text kept in memory
+        db_path: Optional SQLite file for a persistent tier
+        max_disk_bytes: Upper bound on cached text kept in the SQLite tier
+    """
+    max_bytes: int = 64 * 1024 * 1024
+    db_path: str | None = None
+    max_disk_bytes: int = 512 * 1024 * 1024
+    stats: PageCacheStats = field(default_factory=PageCacheStats)
+    _entries: OrderedDict[str, PageCacheEntry] = field(default_factory=OrderedDict, init=False, repr=False)
+    _aliases: dict[str, str] = field(default_factory=dict, init=False, repr=False)
+    _size: int = field(default=0, init=False, repr=False)
+    _db: sqlite3.Connection | None = field(default=None, init=False, repr=False)
+
+    def __post_init__(self):
+        if self.db_path:
+            self._db = sqlite3.connect(self.db_path)
+            self._db.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS pages (
+                    final_url TEXT PRIMARY KEY,
+                    status INTEGER NOT NULL,
+                    text TEXT NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    expires_at REAL NOT NULL,
+                    size INTEGER NOT NULL,
+                    accessed_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS page_aliases (
+                    url TEXT PRIMARY KEY,
+                    final_url TEXT NOT NULL
+                );
+                """
+            )
+            self._db.commit()
+
+    def get(self, url: str) -> PageCacheEntry | None:
+        """Look up an entry by requested or final URL, fresh or stale."""
+        final_url = self._aliases.get(url, url)
+        entry = self._entries.get(final_url)
+        if entry is not None:
+            self._entries.move_to_end(final_url)
+            return entry
+
+        if self._db is not None:
+            row = self._db.execute(
+                "SELECT p.final_url, p.status, p.text, p.etag, p.last_modified, p.expires_at "
+                "FROM pages p LEFT JOIN page_aliases a ON a.final_url = p.final_url "
+                "WHERE p.final_url = ? OR a.url = ? LIMIT 1",
+                (url, url),
+            ).fetchone()
+            if row is not None:
+                entry = PageCacheEntry(*row)
+                self._db.execute("UPDATE pages SET accessed_at = ? WHERE final_url = ?", (time.time(), entry.final_url))
+                self._db.commit()
+                self._remember(url, entry)
+                return entry
+        return None
+
+    def store(self, url: str, final_url: str, status: int, text: str, headers: Mapping[str, str]) -> None:
+        """Store a freshly fetched page if its response headers allow it."""
+        lifetime = freshness_lifetime(headers)
+        if status != 200 or lifetime is None:
+            return
+        entry = PageCacheEntry(
+            final_url=final_url,
+            status=status,
+            text=text,
+            etag=headers.get("ETag"),
+            last_modified=headers.get("Last-Modified"),
+            expires_at=time.time() + lifetime,
+        )
+        # Nothing to gain from an entry that is already stale and cannot be revalidated
+        if not entry.is_fresh() and not entry.validators():
+            return
+        self._remember(url, entry)
+        self._persist(url, entry)
+
+    def refresh(self, url: str, entry: PageCacheEntry, headers: Mapping[str, str]) -> PageCacheEntry:
+        """Extend an entry's lifetime after a 304 Not Modified response."""
+        lifetime = freshness_lifetime(headers) or 0.0
+        refreshed = replace(
+            entry,
+            etag=headers.get("ETag", entry.etag),
+            last_modified=headers.get("Last-Modified", entry.last_modified),
+            expires_at=time.time() + lifetime,
+        )
+        self.stats.revalidated += 1
+        self._remember(url, refreshed)
+        self._persist(url, refreshed)
+        return refreshed
+
+    def _remember(self, url: str, entry: PageCacheEntry) -> None:
+        if entry.size > self.max_bytes:
+            return
+        previous = self._entries.pop(entry.final_url, None)
+        if previous is not None:
+            self._size -= previous.size
+        self._entries[entry.final_url] = entry
+        self._size += entry.size
+        self._aliases[url] = entry.final_url
+        while self._size > self.max_bytes:
+            final_url, evicted = self._entries.popitem(last=False)
+            self._size -= evicted.size
+            self.stats.evictions += 1
+            self._aliases = {alias: target for alias, target in self._aliases.items() if target != final_url}
+
+    def _persist(self, url: str, entry: PageCacheEntry) -> None:
+        if self._db is None:
+            return
+        self._db.execute(
+            "INSERT OR REPLACE INTO pages "
+            "(final_url, status, text, etag, last_modified, expires_at, size, accessed_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (entry.final_url, entry.status, entry.text, entry.etag, entry.last_modified,
+             entry.expires_at, entry.size, time.time()),
+        )
+        self._db.execute(
+            "INSERT OR REPLACE INTO page_aliases (url, final_url) VALUES (?, ?)",
+            (url, entry.final_url),
+        )
+        # Drop least recently used pages until the disk tier fits its budget
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        if total > self.max_disk_bytes:
+            rows = self._db.execute("SELECT final_url, size FROM pages ORDER BY accessed_at").fetchall()
+            for final_url, size in rows:
+                if total <= self.max_disk_bytes:
+                    break
+                self._db.execute("DELETE FROM pages WHERE final_url = ?", (final_url,))
+                self._db.execute("DELETE FROM page_aliases WHERE final_url = ?", (final_url,))
+                total -= size
+        self._db.commit()
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
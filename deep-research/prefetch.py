@@ -0,0 +1,126 @@
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+import asyncio
+import math
+
+from evidence import PageRecord
+
+
+@dataclass
+class PrefetchStats:
+    started: int = 0
+    used: int = 0
+    failed: int = 0
+    cancelled: int = 0
+    skipped: int = 0
+    bytes: int = 0
+
+    @property
+    def hit_rate(self) -> float | None:
+        return self.used / self.started if self.started else None
+
+    def as_dict(self) -> dict:
+        return {
+            "started": self.started,
+            "used": self.used,
+            "failed": self.failed,
+            "cancelled": self.cancelled,
+            "skipped": self.skipped,
+            "bytes": self.bytes,
+        }
+
+
+@dataclass
+class Prefetcher:
+    """
+    Speculative fetches of search results before the model asks for them.
+
+    When a subagent's search comes back, the top results are fetched and
+    extracted in the background so a later web_fetch finds them already warm.
+    The number of results prefetched per search adapts to how many prefetches
+    the run has actually used, never dropping below one. Prefetches are capped
+    in concurrency and in total bytes per run, and whatever is still running
+    when a subagent finishes is cancelled.
+
+    Args:
+        enabled: Prefetch search results at all
+        top_n: Results prefetched per search while prefetches are being used
+        max_concurrent: Prefetches running at the same time
+        max_bytes: Extracted text prefetched per run before prefetching stops
+    """
+    enabled: bool = False
+    top_n: int = 3
+    max_concurrent: int = 4
+    max_bytes: int = 4 * 1024 * 1024
+    stats: PrefetchStats = field(default_factory=PrefetchStats)
+    _slots: asyncio.Semaphore | None = field(default=None, init=False, repr=False)
+    _urls: set[str] = field(default_factory=set, init=False, repr=False)
+    _used: set[str] = field(default_factory=set, init=False, repr=False)
+    _tasks: defaultdict[str, set[asyncio.Task]] = field(default_factory=lambda: defaultdict(set), init=False, repr=False)
+
+    @property
+    def depth(self) -> int:
+        """Results to prefetch for the next search."""
+        rate = self.stats.hit_rate
+        # Wait for a full round of evidence before scaling down
+        if rate is None or self.stats.started < self.top_n:
+            return self.top_n
+        return max(1, min(self.top_n, math.ceil(self.top_n * rate)))
+
+    def schedule(self, agent_id: str, urls: list[str], fetch: Callable[[str], Awaitable[PageRecord]]) -> list[str]:
+        """Start background fetches for the leading `urls`; returns the ones started."""
+        if not self.enabled:
+            return []
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrent)
+
+        started = []
+        for url in urls:
+            if len(started) >= self.depth:
+                break
+            if not url.startswith(("http://", "https://")) or url in self._urls:
+                continue
+            if self.stats.bytes >= self.max_bytes:
+                self.stats.skipped += 1
+                continue
+            self._urls.add(url)
+            self.stats.started += 1
+            task = asyncio.create_task(self._prefetch(url, fetch))
+            self._tasks[agent_id].add(task)
+            task.add_done_callback(self._tasks[agent_id].discard)
+            started.append(url)
+        return started
+
+    async def _prefetch(self, url: str, fetch: Callable[[str], Awaitable[PageRecord]]) -> None:
+        async with self._slots:
+            # The byte budget may have run out while this prefetch was queued
+            if self.stats.bytes >= self.max_bytes:
+                self.stats.skipped += 1
+                return
+            try:
+                record = await fetch(url)
+            except asyncio.CancelledError:
+                self.stats.cancelled += 1
+                raise
+            except Exception:
+                # Speculative: the model's own web_fetch will surface the error if it asks
+                self.stats.failed += 1
+                return
+            self.stats.bytes += len(record.text.encode())
+
+    def claim(self, url: str) -> bool:
+        """Note that the model asked for `url`; True the first time it was one we prefetched."""
+        if url not in self._urls or url in self._used:
+            return False
+        self._used.add(url)
+        self.stats.used += 1
+        return True
+
+    async def cancel(self, agent_id: str | None = None) -> None:
+        """Cancel unfinished prefetches started for `agent_id` (every agent if None)."""
+        agent_ids = list(self._tasks) if agent_id is None else [agent_id]
+        tasks = [task for key in agent_ids for task in self._tasks.pop(key, ())]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
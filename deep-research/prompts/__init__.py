@@ -1,7 +1,9 @@
 from .research_subagent import PROMPT as sub_agent_prompt
 from .research_lead_agent import PROMPT as lead_agent_prompt
+from .research_lead_agent import STREAMING_ADDENDUM as lead_agent_streaming_addendum
 
 __all__ = [
     "sub_agent_prompt",
-    "lead_agent_prompt"
+    "lead_agent_prompt",
+    "lead_agent_streaming_addendum"
 ]
\ No newline at end of file
@@ -0,0 +1,236 @@
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator
+import asyncio
+import heapq
+import itertools
+import os
+import time
+
+from pydantic_ai.messages import ModelMessage, ModelResponse
+from pydantic_ai.models import KnownModelName, Model, ModelRequestParameters, StreamedResponse
+from pydantic_ai.models.wrapper import WrapperModel
+from pydantic_ai.settings import ModelSettings
+
+from metrics import RunMetrics
+
+
+# Lower values are served first
+LEAD_PRIORITY = 0
+SUBAGENT_PRIORITY = 1
+PREFETCH_PRIORITY = 2
+
+
+@dataclass
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, up to `capacity` banked."""
+    rate: float
+    capacity: float
+    _tokens: float = field(default=0.0, init=False)
+    _updated: float = field(default_factory=time.monotonic, init=False)
+    _paused_until: float = field(default=0.0, init=False)
+    _lock: asyncio.Lock = field(default_factory=asyncio.Lock, init=False, repr=False)
+
+    def __post_init__(self):
+        self._tokens = self.capacity
+
+    def pause(self, seconds: float) -> None:
+        """Stop handing out tokens for `seconds`, e.g. after the API answered 429."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0.0
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class PriorityLimiter:
+    """A semaphore whose waiters are woken in priority order, then FIFO."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._counter = itertools.count()
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for *_, future in self._waiters if not future.done())
+
+    async def acquire(self, priority: int) -> None:
+        if self.active < self.limit and not self.queued:
+            self.active += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._counter), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            # The slot may have been handed over just before we were cancelled
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def release(self) -> None:
+        while self._waiters:
+            *_, future = heapq.heappop(self._waiters)
+            if not future.done():
+                # Hand the slot straight to the next waiter
+                future.set_result(None)
+                return
+        self.active -= 1
+
+
+@dataclass
+class LaneStats:
+    acquired: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+    backoffs: int = 0
+
+    def as_dict(self) -> dict:
+        return {
+            "acquired": self.acquired,
+            "avg_wait_ms": round(self.total_wait / self.acquired * 1000, 1) if self.acquired else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 1),
+            "backoffs": self.backoffs,
+        }
+
+
+@dataclass
+class Lane:
+    """
+    Concurrency and rate limits for one kind of outbound call.
+
+    Args:
+        name: Lane name used in stats
+        limit: Maximum calls in flight at once
+        rate: Calls per second allowed for each API key, None for no rate limit
+        burst: Calls that may be made back to back before `rate` applies
+    """
+    name: str
+    limit: int
+    rate: float | None = None
+    burst: int = 1
+    stats: LaneStats = field(default_factory=LaneStats)
+    _limiter: PriorityLimiter | None = field(default=None, init=False, repr=False)
+    _buckets: dict[str, TokenBucket] = field(default_factory=dict, init=False, repr=False)
+
+    @property
+    def limiter(self) -> PriorityLimiter:
+        if self._limiter is None:
+            self._limiter = PriorityLimiter(self.limit)
+        return self._limiter
+
+    def bucket(self, key: str) -> TokenBucket | None:
+        if self.rate is None:
+            return None
+        if key not in self._buckets:
+            self._buckets[key] = TokenBucket(rate=self.rate, capacity=self.burst)
+        return self._buckets[key]
+
+    def backoff(self, key: str, seconds: float) -> None:
+        """Pause calls for `key` after the upstream reported overload."""
+        self.stats.backoffs += 1
+        bucket = self.bucket(key)
+        if bucket is not None:
+            bucket.pause(seconds)
+
+    @asynccontextmanager
+    async def slot(self, priority: int = SUBAGENT_PRIORITY, key: str = "default") -> AsyncIterator[float]:
+        """Wait for a free slot (and a rate token for `key`), then hold it for the block, yielding the seconds waited."""
+        start = time.monotonic()
+        await self.limiter.acquire(priority)
+        try:
+            bucket = self.bucket(key)
+            if bucket is not None:
+                await bucket.acquire()
+            waited = time.monotonic() - start
+            self.stats.acquired += 1
+            self.stats.total_wait += waited
+            self.stats.max_wait = max(self.stats.max_wait, waited)
+            yield waited
+        finally:
+            self.limiter.release()
+
+
+@dataclass
+class Scheduler:
+    """
+    Per-run limits on model, search and fetch calls.
+
+    Calls over a lane's limit queue instead of failing, and lead agent calls
+    jump ahead of queued subagent calls.
+    """
+    model: Lane = field(default_factory=lambda: Lane("model", limit=8))
+    # Brave's free plan allows one query per second; raise BRAVE_RATE_LIMIT on paid plans
+    search: Lane = field(default_factory=lambda: Lane("search", limit=4, rate=float(os.getenv("BRAVE_RATE_LIMIT", "1")), burst=1))
+    fetch: Lane = field(default_factory=lambda: Lane("fetch", limit=16))
+
+    def wrap_model(
+        self,
+        model: Model | KnownModelName,
+        priority: int,
+        metrics: RunMetrics | None = None,
+        agent_id: str = ""
+    ) -> "ScheduledModel":
+        return ScheduledModel(model, self.model, priority, metrics, agent_id)
+
+    def stats(self) -> dict:
+        return {lane.name: lane.stats.as_dict() for lane in (self.model, self.search, self.fetch)}
+
+
+class ScheduledModel(WrapperModel):
+    """
+    Model wrapper that takes a slot in the scheduler's model lane for every request.
+
+    When `metrics` is given, queueing time, model time and token usage are
+    recorded against `agent_id`.
+    """
+
+    def __init__(
+        self,
+        wrapped: Model | KnownModelName,
+        lane: Lane,
+        priority: int,
+        metrics: RunMetrics | None = None,
+        agent_id: str = ""
+    ):
+        super().__init__(wrapped)
+        self.lane = lane
+        self.priority = priority
+        self.metrics = metrics
+        self.agent_id = agent_id
+
+    async def request(self, *args: Any, **kwargs: Any) -> ModelResponse:
+        async with self.lane.slot(self.priority, self.wrapped.system) as waited:
+            if self.metrics is None:
+                return await self.wrapped.request(*args, **kwargs)
+            self.metrics.add_time(self.agent_id, "queue", waited)
+            with self.metrics.timed(self.agent_id, "model"):
+                response = await self.wrapped.request(*args, **kwargs)
+            self.metrics.add_usage(self.agent_id, response.usage)
+            return response
+
+    @asynccontextmanager
+    async def request_stream(
+        self,
+        messages: list[ModelMessage],
+        model_settings: ModelSettings | None,
+        model_request_parameters: ModelRequestParameters,
+    ) -> AsyncIterator[StreamedResponse]:
+        async with self.lane.slot(self.priority, self.wrapped.system) as waited:
+            if self.metrics is not None:
+                self.metrics.add_time(self.agent_id, "queue", waited)
+            async with self.wrapped.request_stream(messages, model_settings, model_request_parameters) as response_stream:
+                yield response_stream
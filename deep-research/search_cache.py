@@ -0,0 +1,154 @@
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable
+import asyncio
+import hashlib
+import json
+import sqlite3
+import time
+
+
+def normalize_search_key(query: str, count: int, country: str, search_lang: str) -> str:
+    """Build a stable cache key so trivially different queries share one entry."""
+    normalized = {
+        "q": " ".join(query.lower().split()),
+        "count": count,
+        "country": country.strip().lower(),
+        "search_lang": search_lang.strip().lower(),
+    }
+    return hashlib.sha256(json.dumps(normalized, sort_keys=True).encode()).hexdigest()
+
+
+@dataclass
+class SearchCacheStats:
+    hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    coalesced: int = 0
+
+    def as_dict(self) -> dict:
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+        }
+
+
+@dataclass
+class SearchCache:
+    """
+    Two-tier TTL cache for search API responses.
+
+    Entries live in an in-memory LRU and, when `db_path` is set, in a SQLite
+    table so they survive across processes. Concurrent lookups for the same key
+    share a single in-flight request.
+
+    Args:
+        ttl: Seconds an entry stays valid
+        max_entries: Maximum number of entries kept in memory
+        db_path: Optional SQLite file for the persistent tier
+    """
+    ttl: float = 3600.0
+    max_entries: int = 512
+    db_path: str | None = None
+    stats: SearchCacheStats = field(default_factory=SearchCacheStats)
+    _memory: OrderedDict[str, tuple[float, Any]] = field(default_factory=OrderedDict, init=False, repr=False)
+    _inflight: dict[str, asyncio.Future] = field(default_factory=dict, init=False, repr=False)
+    _db: sqlite3.Connection | None = field(default=None, init=False, repr=False)
+
+    def __post_init__(self):
+        if self.db_path:
+            self._db = sqlite3.connect(self.db_path)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS search_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.execute("DELETE FROM search_cache WHERE expires_at <= ?", (time.time(),))
+            self._db.commit()
+
+    def get(self, key: str) -> Any | None:
+        now = time.time()
+        entry = self._memory.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > now:
+                self._memory.move_to_end(key)
+                self.stats.hits += 1
+                return value
+            del self._memory[key]
+
+        if self._db is not None:
+            row = self._db.execute(
+                "SELECT value, expires_at FROM search_cache WHERE key = ? AND expires_at > ?",
+                (key, now),
+            ).fetchone()
+            if row is not None:
+                value = json.loads(row[0])
+                self._remember(key, value, row[1])
+                self.stats.disk_hits += 1
+                return value
+        return None
+
+    def set(self, key: str, value: Any) -> None:
+        expires_at = time.time() + self.ttl
+        self._remember(key, value, expires_at)
+        if self._db is not None:
+            self._db.execute(
+                "INSERT OR REPLACE INTO search_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), expires_at),
+            )
+            self._db.commit()
+
+    def _remember(self, key: str, value: Any, expires_at: float) -> None:
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    async def get_or_fetch(self, key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Return the cached value for `key`, calling `fetch` on a miss.
+
+        If another caller is already fetching the same key, wait for its result
+        instead of issuing a duplicate request. Failures are not cached.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.stats.coalesced += 1
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                # The caller that started the fetch was cancelled, not this one
+                if not inflight.cancelled():
+                    raise
+                return await self.get_or_fetch(key, fetch)
+
+        self.stats.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await fetch()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so an unawaited failure does not log a warning
+            future.exception()
+            raise
+        else:
+            self.set(key, value)
+            future.set_result(value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
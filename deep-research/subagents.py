@@ -0,0 +1,120 @@
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable
+import asyncio
+import time
+
+
+@dataclass
+class SubagentTask:
+    agent_id: str
+    prompt: str
+    task: asyncio.Task
+    started: float = field(default_factory=time.monotonic)
+    finished: float | None = None
+    events: list[str] = field(default_factory=list)
+    delivered: bool = False
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.monotonic()) - self.started
+
+    @property
+    def status(self) -> str:
+        if not self.task.done():
+            return "running"
+        if self.task.cancelled():
+            return "cancelled"
+        return "failed" if self.task.exception() is not None else "completed"
+
+
+@dataclass
+class SubagentPool:
+    """
+    Background subagent runs for the lead agent.
+
+    With `streaming` enabled the lead starts subagents without waiting for
+    them, polls for whichever finish first, and can cancel the rest. Progress
+    (each tool call a subagent makes) is recorded on its entry's `events`.
+    Once `time_budget` seconds have passed since the first subagent started,
+    stragglers are cancelled on the next poll.
+
+    Args:
+        streaming: Give the lead non-blocking start/wait/cancel tools instead of run_blocking_subagent
+        time_budget: Seconds the whole fan-out may take, None for no limit
+    """
+    streaming: bool = False
+    time_budget: float | None = 600.0
+    _tasks: dict[str, SubagentTask] = field(default_factory=dict, init=False, repr=False)
+    _first_started: float | None = field(default=None, init=False, repr=False)
+
+    def start(self, agent_id: str, prompt: str, run: Callable[[Callable[[str], None]], Awaitable[Any]]) -> SubagentTask:
+        """Launch `run` in the background; it receives a callback for progress events."""
+        def on_done(_: asyncio.Task) -> None:
+            entry.finished = time.monotonic()
+
+        entry = SubagentTask(agent_id, prompt, asyncio.create_task(run(lambda event: entry.events.append(event))))
+        entry.task.add_done_callback(on_done)
+        self._tasks[agent_id] = entry
+        if self._first_started is None:
+            self._first_started = entry.started
+        return entry
+
+    @property
+    def over_budget(self) -> bool:
+        return (
+            self.time_budget is not None
+            and self._first_started is not None
+            and time.monotonic() - self._first_started > self.time_budget
+        )
+
+    def running(self) -> list[SubagentTask]:
+        return [entry for entry in self._tasks.values() if not entry.task.done()]
+
+    async def wait(self, timeout: float, min_results: int = 1) -> list[SubagentTask]:
+        """
+        Wait up to `timeout` seconds for at least `min_results` undelivered results.
+
+        Returns every finished run not yet handed to the lead, in finishing order.
+        """
+        deadline = time.monotonic() + timeout
+        if self.time_budget is not None and self._first_started is not None:
+            deadline = min(deadline, self._first_started + self.time_budget)
+
+        while True:
+            finished = [entry for entry in self._tasks.values() if entry.task.done() and not entry.delivered]
+            pending = [entry.task for entry in self.running()]
+            remaining = deadline - time.monotonic()
+            if len(finished) >= min_results or not pending or remaining <= 0:
+                break
+            await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+
+        if self.over_budget:
+            await self.cancel()
+            finished = [entry for entry in self._tasks.values() if entry.task.done() and not entry.delivered]
+
+        finished.sort(key=lambda entry: entry.finished or 0.0)
+        for entry in finished:
+            entry.delivered = True
+        return finished
+
+    async def cancel(self, agent_ids: list[str] | None = None) -> list[SubagentTask]:
+        """Cancel running subagents (all of them if `agent_ids` is None)."""
+        targets = [
+            entry for entry in self.running()
+            if agent_ids is None or entry.agent_id in agent_ids
+        ]
+        for entry in targets:
+            entry.task.cancel()
+        await asyncio.gather(*(entry.task for entry in targets), return_exceptions=True)
+        return targets
+
+    async def close(self) -> list[SubagentTask]:
+        """Cancel running subagents and return the failures the lead never collected."""
+        await self.cancel()
+        undelivered = [
+            entry for entry in self._tasks.values()
+            if not entry.delivered and not entry.task.cancelled() and entry.task.exception() is not None
+        ]
+        for entry in undelivered:
+            entry.delivered = True
+        return undelivered
@@ -0,0 +1,132 @@
+"""
+Interrupt a research run while a subagent is still working, then resume it.
+
+Run from the deep-research directory:
+
+    python -m unittest discover tests
+"""
+import asyncio
+import os
+import re
+import tempfile
+import unittest
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("LOGFIRE_SEND_TO_LOGFIRE", "false")
+os.environ.setdefault("LOGFIRE_CONSOLE", "false")
+
+from pydantic_ai.messages import ModelResponse, TextPart, ToolCallPart, ToolReturnPart
+from pydantic_ai.models.function import FunctionModel
+
+import agents
+from checkpoints import CheckpointStore
+from extraction import ExtractionSettings, TextExtractor
+from subagents import SubagentPool
+
+TASKS = ("fast task", "slow task")
+
+
+def tool_returns(messages, tool_name):
+    return [
+        part.content for message in messages for part in message.parts
+        if isinstance(part, ToolReturnPart) and part.tool_name == tool_name
+    ]
+
+
+class ScriptedRun:
+    """A lead that fans out to two subagents, one of which stalls until released."""
+
+    def __init__(self, streaming: bool):
+        self.streaming = streaming
+        self.lead_calls = 0
+        self.subagent_runs = []
+        self.stall = True
+
+    async def lead(self, messages, info):
+        self.lead_calls += 1
+        if not self.streaming:
+            findings = tool_returns(messages, "run_blocking_subagent")
+            if findings:
+                return ModelResponse(parts=[TextPart(self.report(findings))])
+            return ModelResponse(parts=[
+                ToolCallPart("run_blocking_subagent", {"prompt": f"{task} (lead call {self.lead_calls})"}) for task in TASKS
+            ])
+
+        if not tool_returns(messages, "start_subagent"):
+            return ModelResponse(parts=[
+                ToolCallPart("start_subagent", {"prompt": f"{task} (lead call {self.lead_calls})"}) for task in TASKS
+            ])
+        results = tool_returns(messages, "wait_for_subagents")
+        if sum(len(re.findall(r"<findings ", result)) for result in results) < len(TASKS):
+            return ModelResponse(parts=[ToolCallPart("wait_for_subagents", {"timeout": 30, "min_results": len(TASKS)})])
+        return ModelResponse(parts=[TextPart(self.report(results))])
+
+    async def subagent(self, messages, info):
+        prompt = messages[0].parts[-1].content
+        self.subagent_runs.append(prompt)
+        if prompt.startswith("slow") and self.stall:
+            await asyncio.sleep(30)
+        return ModelResponse(parts=[TextPart(f"- The finding for the {prompt} is well supported.")])
+
+    @staticmethod
+    def report(results) -> str:
+        return " ".join(sorted(re.findall(r'<findings id="([^"]+)"', "".join(results))))
+
+
+class ResumeTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.models = (agents.lead_agent.model, agents.sub_agent.model)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "checkpoints.sqlite")
+
+    def tearDown(self):
+        agents.lead_agent.model, agents.sub_agent.model = self.models
+        self.tmp.cleanup()
+
+    def deps(self, streaming: bool) -> agents.AgentDeps:
+        return agents.AgentDeps(
+            extractor=TextExtractor(ExtractionSettings(executor="inline")),
+            subagents=SubagentPool(streaming=streaming),
+            checkpoints=CheckpointStore(self.db_path),
+        )
+
+    async def interrupt_and_resume(self, streaming: bool) -> tuple[ScriptedRun, agents.ResearchReport, dict]:
+        run = ScriptedRun(streaming)
+        agents.lead_agent.model = FunctionModel(run.lead)
+        agents.sub_agent.model = FunctionModel(run.subagent)
+
+        deps = self.deps(streaming)
+        try:
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(agents.research("question", deps, "run-1"), 1.0)
+        finally:
+            await deps.aclose()
+        self.assertEqual(len(run.subagent_runs), 2)
+
+        run.stall = False
+        deps = self.deps(streaming)
+        try:
+            report = await agents.research("question", deps, "run-1")
+            stats = deps.checkpoints.stats.as_dict()
+        finally:
+            await deps.aclose()
+        return run, report, stats
+
+    async def test_blocking_resume_replays_finished_subagent(self):
+        run, report, stats = await self.interrupt_and_resume(streaming=False)
+        # The fan-out is re-run from the saved response, not planned again with new prompts
+        self.assertEqual(run.lead_calls, 2)
+        self.assertEqual(run.subagent_runs[2:], ["slow task (lead call 1)"])
+        self.assertEqual(stats["subagents_replayed"], 1)
+        self.assertEqual(report.output, "subagent-1 subagent-2")
+
+    async def test_streaming_resume_restarts_uncollected_subagents(self):
+        run, report, stats = await self.interrupt_and_resume(streaming=True)
+        # Interrupted inside wait_for_subagents: the finished subagent replays, the stalled one runs again
+        self.assertEqual(run.subagent_runs[2:], ["slow task (lead call 1)"])
+        self.assertEqual(stats["subagents_replayed"], 1)
+        self.assertEqual(report.output, "subagent-1 subagent-2")
+
+
+if __name__ == "__main__":
+    unittest.main()